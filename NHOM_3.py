@@ -1,11 +1,17 @@
-import random
 import numpy as np
 import streamlit as st
 import pandas as pd
-import json
 import os
+import copy
+import uuid
 from datetime import datetime, timedelta
 import re
+from problem import DAY_MAPPING
+from solver import compile_problem, BackgroundSolve, DATA_KEYS, diff_data
+from result_cache import ResultCache
+from profiling import Profiler
+import history_store
+from workbook import read_workbook, NAME_PATTERN, TIME_SLOT_PATTERN
 
 # Thêm CSS tùy chỉnh
 st.markdown("""
@@ -20,26 +26,9 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Đường dẫn file lưu lịch sử lịch học
-HISTORY_FILE = "schedule_history.json"
-
-# Giả định mỗi tiết học là 50 phút
-LESSON_DURATION = 50  # phút
-
-# Ánh xạ ngày tiếng Việt sang tiếng Anh
-DAY_MAPPING = {
-    "Thứ 2": "Monday",
-    "Thứ 3": "Tuesday",
-    "Thứ 4": "Wednesday",
-    "Thứ 5": "Thursday",
-    "Thứ 6": "Friday",
-    "Thứ 7": "Saturday",
-    "Thứ CN": "Sunday"
-}
-
 # Hàm kiểm tra định dạng thời gian rảnh
 def validate_time_format(time_str):
-    pattern = r"^(Thứ [2-7]|Thứ CN)-([0-1][0-9]|2[0-3]):[0-5][0-9]-([0-1][0-9]|2[0-3]):[0-5][0-9]$"
+    pattern = f"^{TIME_SLOT_PATTERN}$"
     times = [t.strip() for t in time_str.split(",") if t.strip()]
     for t in times:
         if not re.match(pattern, t):
@@ -54,7 +43,7 @@ def validate_time_format(time_str):
 
 # Hàm kiểm tra tên không chứa ký tự đặc biệt, nhưng cho phép ký tự tiếng Việt
 def validate_name(name):
-    pattern = r"^[a-zA-Z0-9\s\u00C0-\u1EF9]+$"
+    pattern = f"^{NAME_PATTERN}$"
     return bool(re.match(pattern, name))
 
 # Hàm chuyển đổi thời gian từ chuỗi tiếng Việt sang datetime
@@ -66,128 +55,26 @@ def parse_time_slot(time_str):
     end_dt = datetime.strptime(f"{day_en} {end_time}", "%A %H:%M")
     return start_dt, end_dt
 
-# Tính thời lượng cần thiết từ số tiết
-def calculate_duration_minutes(duration_lessons):
-    return duration_lessons * LESSON_DURATION
-
-# Kiểm tra thời gian rảnh có đủ cho số tiết không
-def is_time_slot_sufficient(teacher_time, required_minutes):
-    start_dt, end_dt = parse_time_slot(teacher_time)
-    available_minutes = int((end_dt - start_dt).total_seconds() / 60)
-    return available_minutes >= required_minutes
-
-# Hàm lưu lịch sử lịch học vào JSON
+# Hàm lưu lịch sử lịch học (thêm một bản ghi vào kho lịch sử SQLite)
 def save_history(schedule):
-    # Đọc lịch sử hiện có (nếu có)
-    history_list = []
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Nếu dữ liệu cũ là một dictionary (cấu trúc cũ), chuyển thành list
-                if isinstance(data, dict):
-                    history_list = [data]
-                # Nếu dữ liệu đã là list (cấu trúc mới), giữ nguyên
-                elif isinstance(data, list):
-                    history_list = data
-        except (json.JSONDecodeError, ValueError):
-            # Nếu file rỗng hoặc lỗi định dạng, khởi tạo danh sách rỗng
-            history_list = []
-
-    # Thêm lịch sử mới vào danh sách
-    new_history = {
-        "schedule": schedule,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    history_list.append(new_history)
+    return history_store.append_history(schedule)
 
-    # Lưu lại toàn bộ danh sách lịch sử
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history_list, f, ensure_ascii=False, indent=4)
+# Hàm đọc nội dung một lịch trong lịch sử; bản ghi không thay đổi sau khi lưu nên được cache theo id
+@st.cache_data(max_entries=64)
+def load_history(record_id):
+    return history_store.load_record(record_id)
 
-# Hàm đọc lịch sử từ JSON
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Nếu dữ liệu là một dictionary (cấu trúc cũ), chuyển thành list
-                if isinstance(data, dict):
-                    return [data]
-                # Nếu dữ liệu là list (cấu trúc mới), trả về nguyên
-                elif isinstance(data, list):
-                    return data
-                else:
-                    return []  # Nếu dữ liệu không hợp lệ, trả về list rỗng
-        except (json.JSONDecodeError, ValueError):
-            # Nếu file rỗng hoặc lỗi định dạng, trả về list rỗng
-            return []
-    return []
-
-# Hàm đọc dữ liệu từ file Excel
+# Hàm đọc dữ liệu từ file Excel: đọc tất cả các sheet một lần, báo mọi dòng lỗi cùng lúc
 def load_from_excel(file):
-    xl = pd.ExcelFile(file)
-    st.session_state.classroom_data = []
-    st.session_state.teacher_data = []
-    st.session_state.student_groups = []
-    st.session_state.courses = []
-
-    # Đọc sheet "Phòng Học"
-    if "Phòng Học" in xl.sheet_names:
-        df = pd.read_excel(file, sheet_name="Phòng Học")
-        for _, row in df.iterrows():
-            if not validate_name(row["Tên phòng học"]):
-                st.error(f"Tên phòng học '{row['Tên phòng học']}' chứa ký tự đặc biệt!")
-                return False
-            st.session_state.classroom_data.append({
-                "name": row["Tên phòng học"],
-                "capacity": int(row["Sức chứa"]),
-                "equipment": row["Thiết bị"].split(","),
-                "location": row["Vị trí"]
-            })
-
-    # Đọc sheet "Giáo Viên"
-    if "Giáo Viên" in xl.sheet_names:
-        df = pd.read_excel(file, sheet_name="Giáo Viên")
-        for _, row in df.iterrows():
-            if not validate_name(row["Tên giáo viên"]):
-                st.error(f"Tên giáo viên '{row['Tên giáo viên']}' chứa ký tự đặc biệt!")
-                return False
-            if not validate_time_format(row["Thời gian rảnh"]):
-                st.error(f"Thời gian rảnh '{row['Thời gian rảnh']}' không đúng định dạng!")
-                return False
-            st.session_state.teacher_data.append({
-                "name": row["Tên giáo viên"],
-                "available_times": [t.strip() for t in row["Thời gian rảnh"].split(",") if t.strip()]
-            })
-
-    # Đọc sheet "Nhóm Sinh Viên"
-    if "Nhóm Sinh Viên" in xl.sheet_names:
-        df = pd.read_excel(file, sheet_name="Nhóm Sinh Viên")
-        for _, row in df.iterrows():
-            if not validate_name(row["Tên nhóm"]):
-                st.error(f"Tên nhóm '{row['Tên nhóm']}' chứa ký tự đặc biệt!")
-                return False
-            st.session_state.student_groups.append({
-                "name": row["Tên nhóm"],
-                "size": int(row["Số sinh viên"])
-            })
-
-    # Đọc sheet "Môn Học"
-    if "Môn Học" in xl.sheet_names:
-        df = pd.read_excel(file, sheet_name="Môn Học")
-        for _, row in df.iterrows():
-            if not validate_name(row["Tên môn học"]) or not validate_name(row["Giáo viên"]) or not validate_name(row["Nhóm sinh viên"]):
-                st.error(f"Tên trong môn học '{row['Tên môn học']}' chứa ký tự đặc biệt!")
-                return False
-            st.session_state.courses.append({
-                "name": row["Tên môn học"],
-                "teacher": row["Giáo viên"],
-                "group": row["Nhóm sinh viên"],
-                "duration": int(row["Thời lượng (số tiết)"]),
-                "required_equipment": row["Thiết bị yêu cầu"].split(",")
-            })
-
+    data, errors = read_workbook(file)
+    if errors:
+        st.error(f"File Excel có {len(errors)} lỗi, vui lòng sửa rồi tải lại:")
+        st.dataframe(pd.DataFrame({"Lỗi": errors}), height=min(400, 35 * (len(errors) + 1)))
+        return False
+    for key, value in data.items():
+        st.session_state[key] = value
+
+    refresh_problem()
     st.success("Đã tải dữ liệu từ file Excel!")
     return True
 
@@ -201,6 +88,18 @@ def initialize_session_state():
         st.session_state.student_groups = []
     if "courses" not in st.session_state:
         st.session_state.courses = []
+    if "problem" not in st.session_state:
+        st.session_state.problem = None
+    # Lần chạy thuật toán đang chạy nền, kết quả lần chạy gần nhất và lịch tạm lấy giữa chừng
+    if "ga_job" not in st.session_state:
+        st.session_state.ga_job = None
+    if "ga_result" not in st.session_state:
+        st.session_state.ga_result = None
+    if "ga_snapshot" not in st.session_state:
+        st.session_state.ga_snapshot = None
+    # Lịch gốc để xếp lại tăng dần: {"schedule", "data" (dữ liệu lúc tạo lịch, None nếu không rõ), "label"}
+    if "ga_base" not in st.session_state:
+        st.session_state.ga_base = None
 
 # Hàm xóa dữ liệu trong session_state
 def clear_session_state():
@@ -208,6 +107,15 @@ def clear_session_state():
     st.session_state.teacher_data = []
     st.session_state.student_groups = []
     st.session_state.courses = []
+    st.session_state.problem = None
+
+# Hàm gom dữ liệu đầu vào trong session_state thành dữ liệu bài toán cho solver
+def session_data():
+    return {key: st.session_state[key] for key in DATA_KEYS}
+
+# Hàm biên dịch lại bài toán sau mỗi lần dữ liệu đầu vào thay đổi
+def refresh_problem():
+    st.session_state.problem = compile_problem(session_data())
 
 # Gọi khởi tạo session_state ngay khi ứng dụng chạy
 initialize_session_state()
@@ -258,6 +166,7 @@ def input_data():
                             st.session_state.classroom_data.append({
                                 "name": room_name, "capacity": capacity, "equipment": equipment.split(","), "location": location
                             })
+                            refresh_problem()
                             st.success(f"Đã lưu phòng {room_name}")
         
         with tab2:
@@ -280,6 +189,7 @@ def input_data():
                             st.session_state.teacher_data.append({
                                 "name": teacher_name, "available_times": [t.strip() for t in available_times.split(",") if t.strip()]
                             })
+                            refresh_problem()
                             st.success(f"Đã lưu giáo viên {teacher_name}")
         
         with tab3:
@@ -298,6 +208,7 @@ def input_data():
                             st.session_state.student_groups.append({
                                 "name": group_name, "size": student_count
                             })
+                            refresh_problem()
                             st.success(f"Đã lưu nhóm {group_name}")
         
         with tab4:
@@ -330,6 +241,7 @@ def input_data():
                                 "name": course_name, "teacher": teacher, "group": group, 
                                 "duration": duration, "required_equipment": required_equipment.split(",")
                             })
+                            refresh_problem()
                             st.success(f"Đã lưu môn {course_name}")
 
     if st.button("Xóa Dữ Liệu", key="clear_data"):
@@ -337,154 +249,193 @@ def input_data():
         st.success("Đã xóa dữ liệu hiện tại!")
 
 # ============================== THUẬT TOÁN DI TRUYỀN ============================== #
-def generate_schedule():
-    if not all([st.session_state.classroom_data, st.session_state.teacher_data, st.session_state.courses]):
-        return []
-    
-    schedule = []
-    used_rooms_times = {}
-    
-    for course in st.session_state.courses:
-        teacher = next((t for t in st.session_state.teacher_data if t['name'] == course['teacher']), None)
-        group = next((g for g in st.session_state.student_groups if g['name'] == course['group']), None)
-        
-        if not teacher or not group:
-            continue
-        
-        required_minutes = calculate_duration_minutes(course['duration'])
-        
-        valid_rooms = [
-            room for room in st.session_state.classroom_data
-            if room['capacity'] >= group['size'] and 
-               all(eq in room['equipment'] for eq in course['required_equipment'])
-        ]
-        
-        if not valid_rooms:
-            continue
-        
-        for time in teacher['available_times']:
-            if not is_time_slot_sufficient(time, required_minutes):
-                continue
-            
-            available_rooms = [
-                room for room in valid_rooms 
-                if time not in used_rooms_times.get(room['name'], [])
-            ]
-            if available_rooms:
-                room = random.choice(available_rooms)
-                schedule.append({
-                    "Môn học": course["name"], "Phòng học": room["name"], 
-                    "Giáo viên": course["teacher"], "Nhóm sinh viên": course["group"], 
-                    "Thời gian": time, "Location": room["location"]
-                })
-                used_rooms_times.setdefault(room['name'], []).append(time)
-                break
+# Lý do dừng thuật toán (stats["stop_reason"]) hiển thị cho người dùng
+STOP_REASONS = {
+    "generations": "đã chạy đủ số thế hệ",
+    "time_budget": "hết thời gian cho phép",
+    "patience": "fitness không còn cải thiện",
+    "target": "đã đạt fitness mục tiêu",
+    "diversity": "quần thể hội tụ (độ đa dạng thấp)",
+    "infeasible": "không tìm được lịch hợp lệ",
+    "cancelled": "người dùng đã dừng"
+}
+
+# Cache kết quả trên đĩa, dùng chung cho mọi phiên
+RESULT_CACHE = ResultCache()
+
+CACHE_STATUS = {
+    "hit": "Lịch được lấy từ cache (cùng dữ liệu và tham số)",
+    "warm": "Quần thể ban đầu được khởi tạo từ nhóm ưu tú đã lưu trong cache",
+    "miss": "Chưa có trong cache, đã chạy từ đầu"
+}
+
+# Chu kỳ cập nhật biểu đồ tiến độ khi thuật toán chạy nền (giây)
+PROGRESS_INTERVAL = 1.0
+
+# Số buổi học mỗi trang khi hiển thị lịch, số lịch mỗi trang ở trang lịch sử
+SCHEDULE_PAGE_ROWS = 200
+HISTORY_PAGE_SIZE = 10
+
+# Hàm bắt đầu chạy thuật toán di truyền trong luồng nền, giao diện không bị khóa trong lúc chạy.
+# incremental: xếp lại từ lịch gốc (ga_base), chỉ tối ưu lại các môn bị ảnh hưởng bởi thay đổi dữ liệu.
+# profile: đo thời gian từng giai đoạn của thuật toán (xem profiling.Profiler).
+def start_solve(use_cache=True, incremental=False, profile=False, **ga_params):
+    if st.session_state.problem is None:
+        refresh_problem()
+    if profile:
+        ga_params["profiler"] = Profiler()
+    # Chép dữ liệu vì các danh sách trong session_state còn bị sửa trực tiếp khi nhập tay
+    data = copy.deepcopy(session_data())
+    base = st.session_state.ga_base
+    if incremental and base:
+        changes = diff_data(base["data"], data) if base["data"] is not None else None
+        job = BackgroundSolve(data, problem=st.session_state.problem, previous=base["schedule"], changes=changes,
+                              **ga_params)
+    else:
+        job = BackgroundSolve(data, problem=st.session_state.problem,
+                              cache=RESULT_CACHE if use_cache else None, **ga_params)
+    st.session_state.ga_job = job.start()
+    st.session_state.ga_result = None
+    st.session_state.ga_snapshot = None
+
+# Hàm nhận kết quả khi luồng nền chạy xong, lưu lịch sử một lần duy nhất
+# (lịch lấy nguyên từ cache đã có trong lịch sử nên không lưu thêm bản sao)
+def collect_solve():
+    job = st.session_state.ga_job
+    st.session_state.ga_job = None
+    schedule, stats = job.result or ([], {})
+    if schedule and stats.get("cache") != "hit":
+        save_history(schedule)
+    if schedule:
+        st.session_state.ga_base = {"schedule": schedule, "data": job.data, "label": "lịch vừa tạo"}
+    profiler = job.ga_params.get("profiler")
+    st.session_state.ga_result = {
+        "schedule": schedule, "stats": stats, "progress": job.snapshot(), "key": f"result-{uuid.uuid4().hex}",
+        "error": str(job.error) if job.error else None,
+        "profile": {
+            "phases": profiler.summary(), "generations": profiler.generations,
+            "json": profiler.export_json(), "csv": profiler.export_csv()
+        } if profiler else None
+    }
+
+# Hàm vẽ biểu đồ fitness theo thế hệ và các chỉ số của thế hệ mới nhất
+def show_progress(progress):
+    df_progress = pd.DataFrame(progress).set_index("generation")
+    latest = progress[-1]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Thế hệ", latest["generation"])
+    col2.metric("Xung đột trung bình", f"{latest['conflicts']:.1f}")
+    col3.metric("Thế hệ / giây", f"{latest['generations_per_second']:.1f}")
+    chart = df_progress[["best_fitness", "mean_fitness"]].replace(float("-inf"), float("nan"))
+    st.line_chart(chart.rename(columns={"best_fitness": "Tốt nhất", "mean_fitness": "Trung bình"}))
+
+# Hàm hiển thị kết quả đo thời gian: tỉ lệ thời gian từng giai đoạn, số liệu theo thế hệ và nút tải xuống
+def show_profile(profile):
+    st.subheader("Thời Gian Từng Giai Đoạn")
+    if not profile["phases"]:
+        st.info("Không có số liệu đo (lịch được lấy từ cache).")
+        return
+    df_phases = pd.DataFrame(profile["phases"]).set_index("phase")
+    st.bar_chart(df_phases["seconds"])
+    st.dataframe(df_phases.style.format({"seconds": "{:.4f}", "share": "{:.1%}"}))
+    if profile["generations"]:
+        df_generations = pd.DataFrame(profile["generations"]).set_index("generation")
+        st.line_chart(df_generations[["evaluations", "cache_hits", "infeasible", "unique"]].rename(columns={
+            "evaluations": "Số lần đánh giá", "cache_hits": "Trúng cache",
+            "infeasible": "Lịch có xung đột", "unique": "Lịch khác nhau"
+        }))
+    col1, col2 = st.columns(2)
+    col1.download_button("Tải xuống số liệu (JSON)", data=profile["json"].encode("utf-8"),
+                         file_name="ga_profile.json", mime="application/json", key="download_profile_json")
+    col2.download_button("Tải xuống theo thế hệ (CSV)", data=profile["csv"].encode("utf-8-sig"),
+                         file_name="ga_profile.csv", mime="text/csv", key="download_profile_csv")
+
+# Hàm tạo nội dung file CSV của lịch học (dấu chấm phẩy làm dấu phân tách)
+def schedule_csv(schedule):
+    return pd.DataFrame(schedule).to_csv(index=False, encoding='utf-8-sig', sep=';').encode('utf-8-sig')
+
+# Hàm tạo bảng xem lịch theo giáo viên/phòng học/nhóm sinh viên (by): mỗi dòng là một đối tượng, mỗi cột là
+# một ngày, mỗi ô liệt kê các buổi học trong ngày theo thứ tự thời gian. Tính một lần cho mỗi lịch (theo key).
+@st.cache_data(max_entries=32)
+def schedule_pivot(key, by, _schedule):
+    df = pd.DataFrame(_schedule)
+    parts = df["Thời gian"].str.split("-", n=1, expand=True)
+    others = [column for column in ("Môn học", "Phòng học", "Giáo viên", "Nhóm sinh viên") if column != by]
+    df["Ngày"], df["Giờ"] = parts[0], parts[1]
+    df["Buổi học"] = df["Giờ"] + " " + df[others[0]] + " (" + df[others[1]] + ", " + df[others[2]] + ")"
+    pivot = (df.sort_values(["Giờ"]).groupby([by, "Ngày"])["Buổi học"].agg("; ".join)
+             .unstack(fill_value=""))
+    return pivot[[day for day in DAY_MAPPING if day in pivot.columns]]
+
+# Hàm hiển thị lịch học theo trang (chỉ tạo bảng định dạng cho trang đang xem) kèm nút tải xuống CSV.
+# CSV chỉ được tạo khi người dùng bấm tải xuống. key: tiền tố khóa các widget (mặc định là tên file);
+# cache_key: khóa cố định của lịch để cache bảng xem theo giáo viên/phòng/nhóm (None = không có bảng này).
+def show_schedule(schedule, file_name="lich_hoc.csv", key=None, cache_key=None):
+    key = key or file_name
+    by = None
+    if cache_key:
+        by = st.selectbox("Xem theo", [None, "Giáo viên", "Phòng học", "Nhóm sinh viên"], key=f"pivot_{key}",
+                          format_func=lambda value: value or "Danh sách buổi học")
+    if by:
+        st.dataframe(schedule_pivot(cache_key, by, schedule), height=300)
+    else:
+        n_pages = (len(schedule) - 1) // SCHEDULE_PAGE_ROWS + 1
+        page = 1
+        if n_pages > 1:
+            page = st.number_input(f"Trang (tổng {len(schedule)} buổi học)", min_value=1, max_value=n_pages,
+                                   value=1, step=1, key=f"page_{key}")
+        start = (page - 1) * SCHEDULE_PAGE_ROWS
+        rows = schedule[start:start + SCHEDULE_PAGE_ROWS]
+        show_schedule_page(pd.DataFrame(rows, index=range(start, start + len(rows))))
+    st.download_button(
+        label="Tải xuống lịch học (CSV)",
+        data=lambda: schedule_csv(schedule),
+        file_name=file_name,
+        mime="text/csv",
+        key=f"download_{key}"
+    )
+
+# Hàm hiển thị một trang lịch học với định dạng bảng
+def show_schedule_page(df_schedule):
+    styled_df = df_schedule.style.set_properties(**{
+        'background-color': '#ffffff',
+        'color': '#333333',
+        'border-color': '#cccccc',
+        'text-align': 'center',
+        'font-size': '14px',
+        'padding': '8px'
+    }).set_table_styles([
+        {'selector': 'th', 'props': [('background-color', '#4CAF50'), ('color', 'white'), ('text-align', 'center')]}
+    ])
+    st.dataframe(styled_df, height=300)
+
+# Phần hiển thị tiến độ, tự chạy lại mỗi PROGRESS_INTERVAL giây trong khi thuật toán chạy nền
+@st.fragment(run_every=PROGRESS_INTERVAL)
+def solve_progress():
+    job = st.session_state.ga_job
+    if job is None:
+        return
+    if job.done:
+        # Chạy lại toàn bộ trang để hiển thị kết quả
+        st.rerun()
+    st.info("Đang dừng..." if job.cancelled else "Đang tạo lịch học tối ưu...")
+    progress = job.snapshot()
+    if progress:
+        show_progress(progress)
+    elif job.seeding:
+        built, total = job.seeding
+        st.progress(built / total, text=f"Đang tạo quần thể ban đầu: {built}/{total} lịch")
+    col1, col2 = st.columns(2)
+    if col1.button("Dừng", key="cancel_solve", disabled=job.cancelled):
+        job.cancel()
+    if col2.button("Lấy lịch tốt nhất hiện tại", key="take_best"):
+        st.session_state.ga_snapshot = job.best_schedule()
+    if st.session_state.ga_snapshot is not None:
+        if st.session_state.ga_snapshot:
+            st.subheader("Lịch Tốt Nhất Hiện Tại")
+            show_schedule(st.session_state.ga_snapshot, "lich_hoc_tam.csv")
         else:
-            continue
-    
-    return schedule
-
-def fitness_function(schedule):
-    if not schedule:
-        return -float('inf')
-    
-    score = 0
-    used_times_teacher = {}
-    used_times_group = {}
-    used_rooms_times = {}
-    teacher_locations = {}
-    group_locations = {}
-    
-    for entry in schedule:
-        teacher = entry['Giáo viên']
-        group = entry['Nhóm sinh viên']
-        room = entry['Phòng học']
-        time = entry['Thời gian']
-        
-        if time in used_rooms_times.get(room, []):
-            return -float('inf')
-        if time in used_times_teacher.get(teacher, []):
-            return -float('inf')
-        if time in used_times_group.get(group, []):
-            return -float('inf')
-        
-        used_rooms_times.setdefault(room, []).append(time)
-        used_times_teacher.setdefault(teacher, []).append(time)
-        used_times_group.setdefault(group, []).append(time)
-        
-        teacher_locations.setdefault(teacher, []).append((time, entry['Location']))
-        group_locations.setdefault(group, []).append((time, entry['Location']))
-    
-    score += len(schedule) * 100
-    
-    for locations in [teacher_locations, group_locations]:
-        for entity, time_locs in locations.items():
-            sorted_locs = sorted(time_locs, key=lambda x: x[0])
-            for i in range(1, len(sorted_locs)):
-                if sorted_locs[i][1] != sorted_locs[i-1][1]:
-                    score -= 10
-    
-    for entry in schedule:
-        room = next(r for r in st.session_state.classroom_data if r['name'] == entry['Phòng học'])
-        group = next(g for g in st.session_state.student_groups if g['name'] == entry['Nhóm sinh viên'])
-        excess_capacity = room['capacity'] - group['size']
-        if excess_capacity > 20:
-            score -= excess_capacity // 10
-    
-    return score
-
-def crossover(parent1, parent2):
-    crossover_point = len(parent1) // 2
-    child = parent1[:crossover_point] + parent2[crossover_point:]
-    return child
-
-def mutate(schedule):
-    if not schedule:
-        return schedule
-    idx = random.randint(0, len(schedule) - 1)
-    course = next(c for c in st.session_state.courses if c['name'] == schedule[idx]['Môn học'])
-    teacher = next(t for t in st.session_state.teacher_data if t['name'] == course['teacher'])
-    group = next(g for g in st.session_state.student_groups if g['name'] == course['group'])
-    
-    required_minutes = calculate_duration_minutes(course['duration'])
-    valid_rooms = [
-        r for r in st.session_state.classroom_data
-        if r['capacity'] >= group['size'] and all(eq in r['equipment'] for eq in course['required_equipment'])
-    ]
-    if valid_rooms:
-        for time in teacher['available_times']:
-            if is_time_slot_sufficient(time, required_minutes):
-                room = random.choice(valid_rooms)
-                schedule[idx] = {
-                    "Môn học": course["name"], "Phòng học": room["name"], 
-                    "Giáo viên": course["teacher"], "Nhóm sinh viên": course["group"], 
-                    "Thời gian": time, "Location": room["location"]
-                }
-                break
-    return schedule
-
-def genetic_algorithm():
-    population_size = 100
-    generations = 500
-    mutation_rate = 0.1
-    
-    population = [generate_schedule() for _ in range(population_size)]
-    if not any(population):
-        return []
-    
-    for _ in range(generations):
-        population = sorted(population, key=fitness_function, reverse=True)
-        if fitness_function(population[0]) == -float('inf'):
-            return []
-        new_population = population[:10]
-        while len(new_population) < population_size:
-            parent1, parent2 = random.sample(population[:50], 2)
-            child = crossover(parent1, parent2)
-            if random.random() < mutation_rate:
-                child = mutate(child)
-            new_population.append(child)
-        population = new_population
-    return population[0]
+            st.warning("Chưa tìm được lịch hợp lệ nào!")
 
 # ============================== CHẠY ỨNG DỤNG ============================== #
 if menu == "Nhập Dữ Liệu":
@@ -497,41 +448,127 @@ elif menu == "Xem Lịch Học":
         hasattr(st.session_state, "classroom_data") and st.session_state.classroom_data and
         hasattr(st.session_state, "teacher_data") and st.session_state.teacher_data
     )
+    # Cấu hình chạy thuật toán di truyền
+    with st.sidebar.expander("Cấu hình thuật toán", expanded=False):
+        # Số tiến trình dùng để tính fitness song song (1 = chạy trên một lõi)
+        workers = st.number_input("Số tiến trình tính fitness", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1, key="ga_workers")
+        # Mô hình đảo: mỗi đảo là một quần thể con chạy trong tiến trình riêng (1 = tắt)
+        islands = st.number_input("Số đảo (quần thể con)", min_value=1, max_value=32, value=1, step=1, key="ga_islands")
+        migration_interval = st.number_input("Số thế hệ giữa hai lần di cư", min_value=1, value=50, step=1, key="ga_migration_interval")
+        migration_size = st.number_input("Số cá thể di cư mỗi lần", min_value=1, max_value=50, value=5, step=1, key="ga_migration_size")
+        seed = st.number_input("Seed (0 = ngẫu nhiên)", min_value=0, value=0, step=1, key="ga_seed")
+        cache_size = st.number_input("Kích thước cache fitness (0 = tắt)", min_value=0, value=50000, step=1000, key="ga_cache_size")
+        mutation_rate = st.slider("Tỉ lệ đột biến", min_value=0.0, max_value=1.0, value=0.1, step=0.05, key="ga_mutation_rate")
+        # Con không lai ghép là bản sao của cha/mẹ, khi đột biến chỉ cần đánh giá tăng dần
+        crossover_rate = st.slider("Tỉ lệ lai ghép", min_value=0.0, max_value=1.0, value=1.0, step=0.05, key="ga_crossover_rate")
+        selection = st.selectbox("Cách chọn cha mẹ", ["truncation", "tournament", "rank"], key="ga_selection",
+                                 format_func={"truncation": "Ngẫu nhiên trong nhóm tốt nhất", "tournament": "Đấu loại (tournament)", "rank": "Theo thứ hạng"}.get)
+        tournament_size = st.number_input("Số cá thể mỗi lượt đấu loại", min_value=2, max_value=20, value=3, step=1, key="ga_tournament_size")
+        crossover = st.selectbox("Cách lai ghép", ["midpoint", "uniform", "multipoint"], key="ga_crossover",
+                                 format_func={"midpoint": "Cắt ở giữa", "uniform": "Đồng đều (uniform)", "multipoint": "Nhiều điểm cắt"}.get)
+        crossover_points = st.number_input("Số điểm cắt", min_value=1, max_value=20, value=2, step=1, key="ga_crossover_points")
+        # Lịch con bị trùng không bị loại mà chịu điểm phạt; một phần được sửa bằng cách chuyển môn trùng sang chỗ trống
+        repair_rate = st.slider("Tỉ lệ sửa lịch bị trùng", min_value=0.0, max_value=1.0, value=0.05, step=0.05, key="ga_repair_rate")
+        # Tinh chỉnh lịch tốt nhất bằng tìm kiếm cục bộ (đổi phòng, dời khung giờ, chuỗi Kempe) sau khi GA kết thúc
+        local_search = st.selectbox("Tinh chỉnh sau thuật toán di truyền", [None, "annealing", "tabu"], key="ga_local_search",
+                                    format_func={None: "Không", "annealing": "Mô phỏng luyện kim", "tabu": "Tìm kiếm tabu"}.get)
+        local_search_iterations = st.number_input("Số bước tinh chỉnh", min_value=10, value=2000, step=100, key="ga_local_search_iterations")
+        # Bài toán lớn (nhiều cơ sở, nhiều môn): chia thành nhiều phần giải song song rồi điều phối phần dùng chung
+        shards = st.number_input("Số phần chia bài toán (1 = không chia)", min_value=1, max_value=32, value=1, step=1, key="ga_shards")
+        shard_by = st.selectbox("Cách chia bài toán", ["coupling", "location"], key="ga_shard_by",
+                                format_func={"coupling": "Theo liên kết giáo viên/nhóm", "location": "Theo tòa nhà"}.get)
+        shard_workers = st.number_input("Số tiến trình giải các phần (0 = theo số lõi)", min_value=0, max_value=os.cpu_count() or 1, value=0, step=1, key="ga_shard_workers")
+        population_size = st.number_input("Kích thước quần thể", min_value=10, value=100, step=10, key="ga_population_size")
+        generations = st.number_input("Số thế hệ tối đa", min_value=1, value=500, step=50, key="ga_generations")
+        # Điều kiện dừng sớm (0 / để trống = tắt)
+        time_budget = st.number_input("Thời gian tối đa (giây, 0 = không giới hạn)", min_value=0, value=0, step=10, key="ga_time_budget")
+        patience = st.number_input("Dừng nếu không cải thiện sau N thế hệ (0 = tắt)", min_value=0, value=0, step=10, key="ga_patience")
+        target_fitness = st.number_input("Fitness mục tiêu (để trống = tắt)", value=None, step=100.0, key="ga_target_fitness")
+        min_diversity = st.slider("Độ đa dạng tối thiểu của quần thể (0 = tắt)", min_value=0.0, max_value=1.0, value=0.0, step=0.05, key="ga_min_diversity")
+        use_cache = st.checkbox("Dùng cache kết quả", value=True, key="ga_use_cache")
+        # Đo đạc gần như không tốn thời gian khi tắt
+        profile = st.checkbox("Đo thời gian từng giai đoạn", value=False, key="ga_profile")
+        if st.button("Xóa cache kết quả", key="clear_result_cache"):
+            RESULT_CACHE.clear()
+    ga_params = {
+        "workers": workers, "islands": islands, "migration_interval": migration_interval,
+        "migration_size": migration_size, "seed": seed or None, "cache_size": cache_size,
+        "mutation_rate": mutation_rate, "crossover_rate": crossover_rate,
+        "selection": selection, "tournament_size": tournament_size,
+        "crossover": crossover, "crossover_points": crossover_points, "repair_rate": repair_rate,
+        "local_search": local_search, "local_search_iterations": local_search_iterations,
+        "shards": shards, "shard_by": shard_by, "shard_workers": shard_workers or None,
+        "population_size": population_size, "generations": generations,
+        "time_budget": time_budget or None, "patience": patience or None,
+        "target_fitness": target_fitness, "min_diversity": min_diversity or None,
+        "use_cache": use_cache, "profile": profile
+    }
+    job = st.session_state.ga_job
+    if job is not None and job.done:
+        collect_solve()
     if not has_data:
         st.warning("Vui lòng nhập dữ liệu (phòng học, giáo viên, môn học) trước khi tạo lịch!")
-    elif st.button("Tạo Lịch Học", key="generate_schedule"):
-        with st.spinner("Đang tạo lịch học tối ưu..."):
-            best_schedule = genetic_algorithm()
-            if not best_schedule:
-                st.error("Không thể tạo lịch học. Vui lòng kiểm tra dữ liệu đầu vào!")
-            else:
-                save_history(best_schedule)
-                st.subheader("Kết Quả Lịch Học")
-                df_schedule = pd.DataFrame(best_schedule)
-                styled_df = df_schedule.style.set_properties(**{
-                    'background-color': '#ffffff',
-                    'color': '#333333',
-                    'border-color': '#cccccc',
-                    'text-align': 'center',
-                    'font-size': '14px',
-                    'padding': '8px'
-                }).set_table_styles([
-                    {'selector': 'th', 'props': [('background-color', '#4CAF50'), ('color', 'white'), ('text-align', 'center')]}
-                ])
-                st.dataframe(styled_df, height=300)
-                # Sửa phần tải xuống: Sử dụng dấu chấm phẩy làm dấu phân tách
-                csv_buffer = df_schedule.to_csv(index=False, encoding='utf-8-sig', sep=';').encode('utf-8-sig')
-                st.download_button(
-                    label="Tải xuống lịch học (CSV)",
-                    data=csv_buffer,
-                    file_name="lich_hoc.csv",
-                    mime="text/csv"
-                )
+    else:
+        incremental = False
+        if st.session_state.ga_base:
+            incremental = st.checkbox(
+                f"Chỉ xếp lại các môn bị ảnh hưởng bởi thay đổi dữ liệu (giữ nguyên phần còn lại của {st.session_state.ga_base['label']})",
+                key="ga_incremental"
+            )
+        if st.button("Tạo Lịch Học", key="generate_schedule", disabled=st.session_state.ga_job is not None):
+            start_solve(incremental=incremental, **ga_params)
+
+    if st.session_state.ga_job is not None:
+        solve_progress()
+    elif st.session_state.ga_result:
+        result = st.session_state.ga_result
+        ga_stats = result["stats"]
+        if result["error"]:
+            st.error(f"Lỗi khi chạy thuật toán: {result['error']}")
+        if ga_stats:
+            st.caption(
+                f"Dừng sau {ga_stats['generations']} thế hệ ({ga_stats['elapsed']:.1f} s): "
+                f"{STOP_REASONS[ga_stats['stop_reason']]}"
+            )
+        if ga_stats.get("cache"):
+            st.caption(CACHE_STATUS[ga_stats["cache"]])
+        if "affected" in ga_stats:
+            st.caption(
+                f"Xếp lại {ga_stats['affected']} môn bị ảnh hưởng; "
+                f"{ga_stats.get('moved', 0)} môn có buổi học khác so với lịch gốc"
+            )
+        if ga_stats.get("local_search"):
+            search = ga_stats["local_search"]
+            st.caption(
+                f"Tinh chỉnh {search['iterations']} bước ({search['elapsed']:.1f} s): "
+                f"fitness {search['start_fitness']:.0f} → {search['fitness']:.0f}"
+            )
+        if ga_stats.get("shards"):
+            st.caption(
+                f"Giải {len(ga_stats['shards'])} phần song song "
+                f"({', '.join(str(shard['courses']) for shard in ga_stats['shards'])} môn); "
+                f"điều phối lại {ga_stats['reconciled']} môn dùng chung giáo viên/nhóm/phòng"
+            )
+        if ga_stats.get("dropped"):
+            st.caption(f"{ga_stats['dropped']} môn bị bỏ xếp vì không còn phòng/khung giờ trống")
+        lookups = ga_stats.get("cache_hits", 0) + ga_stats.get("cache_misses", 0)
+        if lookups:
+            st.caption(
+                f"Cache fitness: {ga_stats['cache_hits']} lần trúng / {ga_stats['cache_misses']} lần trượt "
+                f"({ga_stats['cache_hits'] / lookups:.0%} trúng)"
+            )
+        if result["progress"]:
+            show_progress(result["progress"])
+        if result["profile"]:
+            show_profile(result["profile"])
+        if not result["schedule"]:
+            st.error("Không thể tạo lịch học. Vui lòng kiểm tra dữ liệu đầu vào!")
+        else:
+            st.subheader("Kết Quả Lịch Học")
+            show_schedule(result["schedule"], cache_key=result["key"])
 elif menu == "Xem Lịch Sử":
     st.header("Lịch Sử Lịch Học")
-    history_list = load_history()
-
-    if history_list:
+    if history_store.has_history():
         # Thêm giao diện chọn ngày
         st.subheader("Chọn ngày để xem lịch sử")
         selected_date = st.date_input("Chọn ngày", value=datetime.today())
@@ -539,36 +576,32 @@ elif menu == "Xem Lịch Sử":
         # Chuyển đổi ngày được chọn thành định dạng "YYYY-MM-DD"
         selected_date_str = selected_date.strftime("%Y-%m-%d")
 
-        # Lọc lịch sử theo ngày được chọn
-        filtered_histories = [
-            history for history in history_list
-            if history["timestamp"].startswith(selected_date_str)
-        ]
-
-        if filtered_histories:
-            # Hiển thị tất cả lịch sử trong ngày được chọn
-            for idx, history in enumerate(filtered_histories):
-                st.write(f"**Lịch sử {idx + 1} - Thời gian tạo: {history['timestamp']}**")
-                df_history = pd.DataFrame(history["schedule"])
-                styled_df = df_history.style.set_properties(**{
-                    'background-color': '#ffffff',
-                    'color': '#333333',
-                    'border-color': '#cccccc',
-                    'text-align': 'center',
-                    'font-size': '14px',
-                    'padding': '8px'
-                }).set_table_styles([
-                    {'selector': 'th', 'props': [('background-color', '#4CAF50'), ('color', 'white'), ('text-align', 'center')]}
-                ])
-                st.dataframe(styled_df, height=300)
-                # Tải xuống lịch sử
-                csv_buffer = df_history.to_csv(index=False, encoding='utf-8-sig', sep=';').encode('utf-8-sig')
-                st.download_button(
-                    label=f"Tải xuống lịch sử {idx + 1} (CSV)",
-                    data=csv_buffer,
-                    file_name=f"lich_su_{history['timestamp'].replace(':', '-')}.csv",
-                    mime="text/csv"
-                )
+        # Chỉ đọc danh sách (id, thời gian tạo) của một trang; nội dung lịch chỉ được đọc khi mở bản ghi
+        total = history_store.count_day(selected_date_str)
+
+        if total:
+            n_pages = (total - 1) // HISTORY_PAGE_SIZE + 1
+            page = 1
+            if n_pages > 1:
+                page = st.number_input(f"Trang (tổng {total} lịch)", min_value=1, max_value=n_pages, value=1, step=1,
+                                       key="history_page")
+            offset = (page - 1) * HISTORY_PAGE_SIZE
+            records = history_store.list_day(selected_date_str, offset, HISTORY_PAGE_SIZE)
+            for idx, record in enumerate(records, start=offset + 1):
+                # on_change="rerun": nội dung bên trong chỉ chạy khi bản ghi được mở
+                with st.expander(f"Lịch sử {idx} - Thời gian tạo: {record['timestamp']}",
+                                 key=f"history_{record['id']}", on_change="rerun") as expander:
+                    if not expander.open:
+                        continue
+                    schedule = load_history(record["id"])
+                    show_schedule(schedule, file_name=f"lich_su_{record['timestamp'].replace(':', '-')}.csv",
+                                  key=f"history_{record['id']}", cache_key=f"history-{record['id']}")
+                    # Dùng lịch này làm gốc để xếp lại tăng dần ở trang "Xem Lịch Học"
+                    if st.button(f"Dùng lịch sử {idx} làm lịch gốc để xếp lại", key=f"use_base_{record['id']}"):
+                        st.session_state.ga_base = {
+                            "schedule": schedule, "data": None, "label": f"lịch sử {record['timestamp']}"
+                        }
+                        st.success("Đã chọn lịch gốc, vào trang \"Xem Lịch Học\" để xếp lại.")
         else:
             st.info(f"Không có lịch sử lịch học nào cho ngày {selected_date_str}!")
     else:
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from problem import CompiledProblem, DAY_MAPPING
+from ga_engine import batch_fitness, greedy_schedule, ParallelEvaluator, run_ga
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+EQUIPMENT = ["máy chiếu", "bảng", "máy tính", "loa", "micro"]
+
+# Khung giờ học trong ngày của dữ liệu tổng hợp (7:00 - 21:00, 6 ngày/tuần)
+FIRST_HOUR, LAST_HOUR = 7, 21
+WEEK_HOURS = 6 * (LAST_HOUR - FIRST_HOUR)
+
+
+# Hàm sinh dữ liệu tổng hợp cùng định dạng với dữ liệu nhập từ Excel.
+# equipment_density: xác suất mỗi phòng có một loại thiết bị (phòng có ít nhất một thiết bị).
+# availability: tỉ lệ số giờ rảnh của mỗi giáo viên trên tổng số giờ học trong tuần (càng nhỏ càng thưa).
+def make_synthetic_data(n_rooms=60, n_teachers=80, n_groups=60, n_courses=600, n_locations=4, seed=0,
+                        equipment_density=0.7, availability=0.2):
+    rnd = random.Random(seed)
+    days = list(DAY_MAPPING)[:6]
+    rooms = []
+    for i in range(n_rooms):
+        equipment = [item for item in EQUIPMENT if rnd.random() < equipment_density] or [rnd.choice(EQUIPMENT)]
+        rooms.append({
+            "name": f"Phong {i + 1}",
+            "capacity": rnd.choice([30, 40, 50, 60, 80, 120]),
+            "equipment": equipment,
+            "location": f"Tòa {chr(65 + i % n_locations)} Tầng {i % 5 + 1}"
+        })
+    teachers = []
+    for i in range(n_teachers):
+        times = set()
+        hours = 0
+        while hours < max(availability * WEEK_HOURS, 1):
+            start = rnd.randint(FIRST_HOUR, LAST_HOUR - 2)
+            end = min(start + rnd.randint(2, 5), LAST_HOUR)
+            times.add(f"{rnd.choice(days)}-{start:02d}:00-{end:02d}:00")
+            hours += end - start
+        teachers.append({"name": f"GV {i + 1}", "available_times": sorted(times)})
+    groups = [{"name": f"Nhóm {i + 1}", "size": rnd.randint(15, 70)} for i in range(n_groups)]
+    courses = [{
+        "name": f"Môn {i + 1}",
+        "teacher": f"GV {rnd.randint(1, n_teachers)}",
+        "group": f"Nhóm {rnd.randint(1, n_groups)}",
+        "duration": rnd.randint(1, 3),
+        "required_equipment": rnd.sample(EQUIPMENT, rnd.randint(1, 2))
+    } for i in range(n_courses)]
+    return rooms, teachers, groups, courses
+
+
+# Đo thời gian đánh giá fitness với số tiến trình khác nhau
+def bench_parallel(args):
+    problem = CompiledProblem(*make_synthetic_data(args.rooms, args.teachers, args.groups, args.courses))
+    rng = np.random.default_rng(0)
+    population = np.stack([greedy_schedule(problem, rng) for _ in range(args.population)])
+    print(f"Bài toán: {problem.n_courses} môn, {problem.n_rooms} phòng, {problem.n_slots} khung giờ; "
+          f"quần thể {args.population}, {args.repeats} lần đánh giá")
+
+    baseline = None
+    for workers in args.workers:
+        evaluator = ParallelEvaluator(problem, workers) if workers > 1 else None
+        evaluate = evaluator or (lambda pop: batch_fitness(problem, pop))
+        try:
+            evaluate(population)  # khởi động pool, không tính vào thời gian đo
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                evaluate(population)
+            elapsed = time.perf_counter() - start
+        finally:
+            if evaluator:
+                evaluator.close()
+        baseline = baseline or elapsed
+        print(f"{workers:>3} tiến trình: {elapsed:8.3f}s   tăng tốc x{baseline / elapsed:.2f}")
+
+
+# Bộ nhớ đỉnh của tiến trình (MB); None nếu hệ điều hành không hỗ trợ
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+# Chạy thuật toán một lần và đo các chỉ số hiệu năng/chất lượng
+def measure_run(problem, ga_params, trace_memory=False):
+    first_feasible = []
+
+    def on_generation(progress):
+        if not first_feasible and progress["best_fitness"] > -np.inf and not progress["best_conflicts"]:
+            first_feasible.append(progress["elapsed"])
+
+    if trace_memory:
+        tracemalloc.start()
+    best, stats = run_ga(problem, on_generation=on_generation, **ga_params)
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    elapsed = stats["elapsed"]
+    return {
+        "seed": ga_params.get("seed"),
+        "final_fitness": stats["fitness"] if best is not None else None,
+        "generations": stats["generations"],
+        "elapsed": elapsed,
+        "generations_per_second": stats["generations"] / elapsed if elapsed else 0.0,
+        "evaluations_per_second": stats["evaluations"] / elapsed if elapsed else 0.0,
+        "time_to_first_feasible": first_feasible[0] if first_feasible else None,
+        "peak_traced_mb": traced_peak,
+        "stop_reason": stats["stop_reason"],
+    }
+
+
+# Các chỉ số dùng để so sánh hai báo cáo: True = càng lớn càng tốt
+METRICS = {
+    "generations_per_second": True,
+    "evaluations_per_second": True,
+    "final_fitness": True,
+    "time_to_first_feasible": False,
+    "peak_rss_mb": False,
+    "peak_traced_mb": False,
+}
+
+
+# Sinh bài toán theo quy mô đã cho, chạy thuật toán nhiều lần và ghi báo cáo JSON
+def bench_run(args):
+    start = time.perf_counter()
+    data = make_synthetic_data(args.rooms, args.teachers, args.groups, args.courses, args.locations,
+                               args.data_seed, args.equipment_density, args.availability)
+    problem = CompiledProblem(*data)
+    compile_time = time.perf_counter() - start
+    ga_params = {
+        "population_size": args.population, "generations": args.generations, "workers": args.workers,
+        "islands": args.islands, "cache_size": args.cache_size, "time_budget": args.time_budget,
+        "selection": args.selection, "crossover": args.crossover, "repair_rate": args.repair_rate,
+    }
+    runs = []
+    for i in range(args.repeats):
+        runs.append(measure_run(problem, dict(ga_params, seed=args.seed + i), args.trace_memory))
+        print(f"Lần {i + 1}: {runs[-1]['generations_per_second']:.1f} thế hệ/s, "
+              f"fitness {runs[-1]['final_fitness']}", file=sys.stderr)
+
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        summary[metric] = float(np.median(values)) if values else None
+    summary["peak_rss_mb"] = peak_rss_mb()
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "cpus": os.cpu_count()},
+        "problem": {
+            "rooms": args.rooms, "teachers": args.teachers, "groups": args.groups, "courses": args.courses,
+            "locations": args.locations, "equipment_density": args.equipment_density,
+            "availability": args.availability, "data_seed": args.data_seed,
+            "slots": problem.n_slots, "compile_seconds": compile_time,
+        },
+        "params": ga_params,
+        "runs": runs,
+        "summary": summary,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+# So sánh báo cáo hiện tại với báo cáo gốc; chỉ số nào kém hơn quá tolerance (tương đối) là hồi quy.
+# Trả về mã thoát 1 nếu có hồi quy để dùng được trong CI.
+def bench_compare(args):
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["summary"]
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)["summary"]
+    regressions = []
+    print(f"{'Chỉ số':<26}{'Gốc':>14}{'Hiện tại':>14}{'Thay đổi':>10}")
+    for metric, higher_is_better in METRICS.items():
+        old, new = baseline.get(metric), current.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / abs(old) if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > args.tolerance:
+            flag = "  HỒI QUY"
+            regressions.append(metric)
+        print(f"{metric:<26}{old:>14.3f}{new:>14.3f}{change:>+10.1%}{flag}")
+    if regressions:
+        print(f"Hồi quy: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng bộ xếp lịch")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parallel = commands.add_parser("parallel", help="Đo tăng tốc khi đánh giá fitness song song")
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parallel.add_argument("--rooms", type=int, default=120)
+    parallel.add_argument("--teachers", type=int, default=300)
+    parallel.add_argument("--groups", type=int, default=200)
+    parallel.add_argument("--courses", type=int, default=3000)
+    parallel.add_argument("--population", type=int, default=400)
+    parallel.add_argument("--repeats", type=int, default=20)
+    parallel.set_defaults(func=bench_parallel)
+
+    run = commands.add_parser("run", help="Chạy thuật toán trên dữ liệu tổng hợp và ghi báo cáo JSON")
+    run.add_argument("--rooms", type=int, default=60)
+    run.add_argument("--teachers", type=int, default=80)
+    run.add_argument("--groups", type=int, default=60)
+    run.add_argument("--courses", type=int, default=600)
+    run.add_argument("--locations", type=int, default=4)
+    run.add_argument("--equipment-density", type=float, default=0.7)
+    run.add_argument("--availability", type=float, default=0.2)
+    run.add_argument("--data-seed", type=int, default=0)
+    run.add_argument("--population", type=int, default=100)
+    run.add_argument("--generations", type=int, default=200)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--islands", type=int, default=1)
+    run.add_argument("--cache-size", type=int, default=50000)
+    run.add_argument("--time-budget", type=float)
+    run.add_argument("--selection", default="truncation")
+    run.add_argument("--crossover", default="midpoint")
+    run.add_argument("--repair-rate", type=float, default=0.05)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeats", type=int, default=3)
+    run.add_argument("--trace-memory", action="store_true",
+                     help="Đo bộ nhớ cấp phát bằng tracemalloc (làm chậm lần chạy)")
+    run.add_argument("-o", "--output", help="File báo cáo JSON (mặc định in ra màn hình)")
+    run.set_defaults(func=bench_run)
+
+    compare = commands.add_parser("compare", help="So sánh hai báo cáo và báo các chỉ số bị hồi quy")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.1, help="Mức kém hơn cho phép (tương đối)")
+    compare.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
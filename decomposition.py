@@ -0,0 +1,192 @@
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from problem import CompiledProblem
+from ga_engine import (run_ga, repair, batch_components, score_components, Occupancy, UNASSIGNED, GENE_DTYPE,
+                       N_COMPONENTS)
+from profiling import NO_PROFILER
+
+# Các cách chia bài toán thành các phần nhỏ (shard):
+#   "location": theo tòa nhà, mỗi shard chỉ dùng phòng của một tòa, môn học thuộc tòa có nhiều phòng hợp lệ nhất
+#   "coupling": theo đồ thị liên kết giáo viên/nhóm, các môn chung giáo viên hoặc nhóm được giữ cùng một shard;
+#               phòng học được chia đều (xen kẽ theo sức chứa) cho các shard
+SHARD_MODES = ("location", "coupling")
+# Tham số chỉ dùng ở tiến trình chính (không gửi được sang tiến trình con hoặc không áp dụng cho từng shard)
+LOCAL_PARAMS = {"on_generation", "on_seed", "cancel", "profiler", "initial_population", "keep_elites", "base_genes",
+                "fixed", "workers"}
+
+
+# Tên tòa nhà của một vị trí: phần đứng trước "Tầng" (ví dụ "Tòa A Tầng 2" -> "Tòa A"), nếu không có thì cả chuỗi
+def building(location):
+    return location.split("Tầng")[0].strip() or location
+
+
+# Các nhóm môn liên thông trong đồ thị liên kết (hai môn nối với nhau nếu chung giáo viên hoặc nhóm),
+# mỗi nhóm liệt kê theo thứ tự duyệt theo chiều rộng nên các môn liên kết chặt đứng gần nhau
+def coupling_components(problem):
+    visited = np.zeros(problem.n_courses, dtype=bool)
+    components = []
+    for start in range(problem.n_courses):
+        if visited[start]:
+            continue
+        visited[start] = True
+        order = []
+        queue = deque([start])
+        while queue:
+            c = queue.popleft()
+            order.append(c)
+            t, g = problem.course_teacher[c], problem.course_group[c]
+            neighbors = [problem.teacher_courses[t] if t >= 0 else (), problem.group_courses[g] if g >= 0 else ()]
+            for members in neighbors:
+                for d in members:
+                    if not visited[d]:
+                        visited[d] = True
+                        queue.append(d)
+        components.append(order)
+    return components
+
+
+# Chia các phần (kích thước sizes) vào tối đa n thùng: phần lớn trước vào thùng đang nhẹ nhất.
+# Trả về danh sách chỉ số các phần của từng thùng không rỗng.
+def _balance(sizes, n):
+    bins = [[] for _ in range(n)]
+    loads = [0] * n
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        b = loads.index(min(loads))
+        bins[b].append(i)
+        loads[b] += sizes[i]
+    return [members for members in bins if members]
+
+
+# Hàm chia bài toán thành tối đa shards phần. Trả về danh sách (chỉ số các môn, chỉ số các phòng) của từng shard.
+# Giáo viên/nhóm có thể xuất hiện ở nhiều shard (khi một nhóm liên thông quá lớn phải cắt, hoặc khi chia theo tòa
+# nhà); các trùng lặp giữa các shard được xử lý ở bước điều phối (reconcile).
+def partition(problem, mode="coupling", shards=4):
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Cách chia bài toán không hợp lệ: {mode}")
+    if mode == "location":
+        names = sorted({building(room["location"]) for room in problem.rooms})
+        room_building = np.array([names.index(building(room["location"])) for room in problem.rooms], dtype=np.int64)
+        # Mỗi môn thuộc tòa nhà có nhiều phòng hợp lệ nhất cho môn đó
+        course_building = np.array([
+            np.bincount(room_building[rooms], minlength=len(names)).argmax() if rooms.size else 0
+            for rooms in problem.course_rooms
+        ], dtype=np.int64)
+        sizes = np.bincount(course_building, minlength=len(names))
+        # Nhiều tòa hơn số shard: gộp các tòa ít môn vào cùng một shard
+        result = []
+        for members in _balance(list(sizes), shards):
+            courses = np.flatnonzero(np.isin(course_building, members))
+            if courses.size:
+                result.append((courses, np.flatnonzero(np.isin(room_building, members))))
+        return result
+
+    # Mỗi shard cần ít nhất một phòng
+    shards = max(1, min(shards, problem.n_rooms))
+    # Nhóm liên thông lớn hơn kích thước mục tiêu được cắt theo thứ tự duyệt (ít cạnh bị cắt nhất có thể)
+    target = max(1, -(-problem.n_courses // shards))
+    parts = []
+    for component in coupling_components(problem):
+        parts.extend(component[i:i + target] for i in range(0, len(component), target))
+    course_shards = [np.array(sorted(c for i in members for c in parts[i]), dtype=np.int64)
+                     for members in _balance([len(part) for part in parts], shards)]
+    # Phòng chia xen kẽ theo sức chứa để mỗi shard có đủ loại phòng
+    order = sorted(range(problem.n_rooms), key=lambda r: (problem.rooms[r]["capacity"], problem.rooms[r]["location"]))
+    n = len(course_shards)
+    return [(courses, np.array(sorted(order[i::n]), dtype=np.int64)) for i, courses in enumerate(course_shards)]
+
+
+# Dữ liệu của một shard (phòng, giáo viên, nhóm, môn học) cùng định dạng với dữ liệu nhập
+def shard_data(problem, courses, rooms):
+    course_list = [problem.courses[c] for c in courses]
+    teachers = {course["teacher"] for course in course_list}
+    groups = {course["group"] for course in course_list}
+    return (
+        [problem.rooms[r] for r in rooms],
+        [teacher for teacher in problem.teachers if teacher["name"] in teachers],
+        [group for group in problem.groups if group["name"] in groups],
+        course_list,
+    )
+
+
+# Giải một shard trong tiến trình con; trả về (các buổi đã xếp dạng (môn trong shard, tên phòng, tên slot), thống kê)
+def _solve_shard(shard, ga_params):
+    problem = CompiledProblem(*shard)
+    best, stats = run_ga(problem, **ga_params)
+    placements = []
+    if best is not None:
+        for c in np.flatnonzero(best >= 0):
+            placements.append((int(c), problem.rooms[best[c] % problem.n_rooms]["name"],
+                                problem.slot_names[best[c] // problem.n_rooms]))
+    return placements, stats
+
+
+# Bước điều phối sau khi ghép các shard: các môn bị trùng giữa các shard (chung giáo viên, nhóm hoặc phòng) được
+# chuyển sang chỗ trống, các môn shard không xếp được thử xếp lại trên toàn bộ phòng, cuối cùng bỏ xếp các môn
+# vẫn còn trùng. Sửa trực tiếp trên genes.
+def reconcile(problem, genes, rng):
+    repair(problem, genes, rng)
+    occupancy = Occupancy(problem, genes)
+    missing = np.flatnonzero((genes < 0) & (problem.course_options > 0))
+    for c in missing[np.argsort(problem.course_options[missing], kind="stable")]:
+        placement = occupancy.best_free(c, rng)
+        if placement is not None:
+            room, slot = placement
+            genes[c] = slot * problem.n_rooms + room
+            occupancy.place(c, room, slot)
+    repair(problem, genes, rng, drop=True)
+
+
+# Hàm xếp lịch theo từng phần: chia bài toán (xem partition), giải các shard song song trong các tiến trình riêng
+# (tối đa shard_workers tiến trình, mặc định theo số lõi), ghép kết quả rồi điều phối các tài nguyên dùng chung.
+# ga_params chuyển cho run_ga của từng shard (trừ LOCAL_PARAMS, mỗi shard đánh giá fitness trên một tiến trình);
+# mỗi shard có seed riêng suy ra từ seed.
+# Trả về (gen tốt nhất của toàn bộ bài toán hoặc None, thống kê) giống run_ga; stats["shards"] có số liệu từng shard.
+def solve_sharded(problem, mode="coupling", shards=4, shard_workers=None, seed=None, profiler=None, **ga_params):
+    start = time.perf_counter()
+    profiler = profiler or NO_PROFILER
+    shard_params = {key: value for key, value in ga_params.items() if key not in LOCAL_PARAMS}
+    with profiler.phase("partition"):
+        parts = partition(problem, mode, shards)
+        data = [shard_data(problem, courses, rooms) for courses, rooms in parts]
+    seeds = np.random.SeedSequence(seed).spawn(len(parts))
+    with profiler.phase("shards"):
+        with ProcessPoolExecutor(max_workers=max(1, min(len(parts), shard_workers or os.cpu_count() or 1))) as pool:
+            futures = [pool.submit(_solve_shard, shard, dict(shard_params, seed=int(s.generate_state(1)[0])))
+                       for shard, s in zip(data, seeds)]
+            results = [future.result() for future in futures]
+
+    genes = np.full(problem.n_courses, UNASSIGNED, dtype=GENE_DTYPE)
+    for (courses, _), (placements, _) in zip(parts, results):
+        for c, room, slot in placements:
+            genes[courses[c]] = problem.slot_index[slot] * problem.n_rooms + problem.room_index[room]
+    merged = genes.copy()
+    with profiler.phase("reconcile"):
+        reconcile(problem, genes, np.random.default_rng(seed))
+
+    shard_stats = [results[i][1] for i in range(len(parts))]
+    # Lý do dừng chung là lý do phổ biến nhất trong các shard tìm được lịch
+    reasons = Counter(stats["stop_reason"] for stats in shard_stats if stats["stop_reason"] != "infeasible")
+    components = batch_components(problem, genes)[0] if (genes >= 0).any() else np.zeros(N_COMPONENTS, dtype=np.int64)
+    stats = {
+        "fitness": float(score_components(components)[0]),
+        "generations": max(stats["generations"] for stats in shard_stats),
+        "elapsed": time.perf_counter() - start,
+        "cache_hits": sum(stats["cache_hits"] for stats in shard_stats),
+        "cache_misses": sum(stats["cache_misses"] for stats in shard_stats),
+        "evaluations": sum(stats["evaluations"] for stats in shard_stats),
+        "stop_reason": reasons.most_common(1)[0][0] if reasons else "infeasible",
+        "dropped": int(((merged >= 0) & (genes < 0)).sum()),
+        "reconciled": int((merged != genes).sum()),
+        "shards": [
+            {"courses": int(courses.size), "rooms": int(rooms.size), "fitness": stats["fitness"],
+             "generations": stats["generations"], "elapsed": stats["elapsed"]}
+            for (courses, rooms), stats in zip(parts, shard_stats)
+        ],
+    }
+    if not (genes >= 0).any():
+        stats["stop_reason"] = "infeasible"
+        return None, stats
+    return genes, stats
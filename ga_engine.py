@@ -0,0 +1,925 @@
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from problem import WEEK_MINUTES
+from profiling import NO_PROFILER
+
+# Điểm thưởng cho mỗi môn học được xếp lịch
+SCHEDULED_REWARD = 100
+# Điểm phạt mỗi lần giáo viên/nhóm phải đổi vị trí giữa hai buổi liên tiếp
+LOCATION_CHANGE_PENALTY = 10
+# Điểm phạt mỗi buổi học bị trùng phòng/giáo viên/nhóm. Lớn hơn SCHEDULED_REWARD nên bỏ xếp một môn
+# bị trùng luôn tốt hơn giữ nó: lịch tốt nhất không bao giờ có trùng, nhưng lịch có trùng vẫn được
+# xếp hạng theo mức vi phạm thay vì bị loại bỏ hoàn toàn.
+CLASH_PENALTY = 200
+
+# Mỗi cá thể là một mảng số nguyên, mỗi phần tử (gen) ứng với một môn học:
+#   gen = slot_id * n_rooms + room_id, hoặc -1 nếu môn học chưa được xếp.
+# slot_id là một khoảng thời gian cụ thể (xem CompiledProblem), hai slot khác nhau có thể chồng lấn.
+# Cả quần thể được lưu trong một mảng 2 chiều (số cá thể x số môn học).
+UNASSIGNED = -1
+GENE_DTYPE = np.int32
+
+# Mỗi cá thể mang theo các thành phần của fitness (số lần trùng và tổng điểm phạt),
+# nhờ vậy khi chỉ một gen thay đổi có thể cập nhật fitness mà không phải tính lại từ đầu.
+ROOM_CLASHES, TEACHER_CLASHES, GROUP_CLASHES, ASSIGNED, LOCATION_CHANGES, EXCESS = range(6)
+N_COMPONENTS = 6
+
+
+# Hàm tách gen thành (phòng, khung thời gian)
+def split_genes(problem, genes):
+    genes = genes.astype(np.int64)
+    return genes % problem.n_rooms, genes // problem.n_rooms
+
+
+# Bảng chiếm dụng theo slot của phòng, giáo viên và nhóm: load[r, s] là số buổi học đã đặt của tài nguyên r
+# chồng lấn với slot s, nhờ vậy kiểm tra một cặp phòng x slot còn trống chỉ là tra bảng.
+# Ghi nhớ vị trí buổi được đặt gần nhất của từng giáo viên/nhóm để ưu tiên không phải đổi vị trí.
+class Occupancy:
+    def __init__(self, problem, genes=None):
+        self.problem = problem
+        n_slots = problem.n_slots
+        self.room_load = np.zeros((problem.n_rooms, n_slots), dtype=np.int32)
+        self.teacher_load = np.zeros((problem.n_teachers, n_slots), dtype=np.int32)
+        self.group_load = np.zeros((problem.n_groups, n_slots), dtype=np.int32)
+        self.teacher_location = np.full(problem.n_teachers, -1, dtype=np.int64)
+        self.group_location = np.full(problem.n_groups, -1, dtype=np.int64)
+        if genes is not None:
+            # Dựng bảng cho mọi môn đã xếp của genes trong một lượt (cộng dồn theo từng tài nguyên)
+            placed = np.flatnonzero(genes >= 0)
+            rooms, slots = split_genes(problem, genes[placed])
+            conflicts = problem.slot_conflicts[slots]
+            for load, resource in ((self.room_load, rooms), (self.teacher_load, problem.course_teacher[placed]),
+                                   (self.group_load, problem.course_group[placed])):
+                order = np.argsort(resource, kind="stable")
+                resource = resource[order]
+                starts = np.flatnonzero(np.r_[True, resource[1:] != resource[:-1]]) if resource.size else resource
+                if starts.size:
+                    load[resource[starts]] = np.add.reduceat(conflicts[order], starts, axis=0, dtype=np.int32)
+
+    # Số buổi học (kể cả chính môn c nếu đã đặt) chồng lấn với slot trên phòng, giáo viên hoặc nhóm của môn c
+    def load(self, c, room, slot):
+        t, g = self.problem.course_teacher[c], self.problem.course_group[c]
+        return max(self.room_load[room, slot], self.teacher_load[t, slot], self.group_load[g, slot])
+
+    def is_free(self, c, room, slot):
+        return self.load(c, room, slot) == 0
+
+    # Mặt nạ các cặp (phòng hợp lệ x slot hợp lệ) của môn c còn trống, theo course_rooms[c] x course_slots[c]
+    def free_mask(self, c):
+        problem = self.problem
+        slots = problem.course_slots[c]
+        t, g = problem.course_teacher[c], problem.course_group[c]
+        return ((self.room_load[np.ix_(problem.course_rooms[c], slots)] == 0) &
+                (self.teacher_load[t, slots] == 0) & (self.group_load[g, slots] == 0))
+
+    # Cặp (phòng, slot) còn trống tốt nhất cho môn c: chỉ chọn ngẫu nhiên giữa các lựa chọn tốt ngang nhau
+    # (ít phòng thừa chỗ, không phải đổi vị trí so với buổi gần nhất của giáo viên/nhóm); None nếu hết chỗ
+    def best_free(self, c, rng):
+        problem = self.problem
+        valid_rooms, slots = problem.course_rooms[c], problem.course_slots[c]
+        t, g = problem.course_teacher[c], problem.course_group[c]
+        free = self.free_mask(c)
+        if not free.any():
+            return None
+        locations = problem.room_location[valid_rooms]
+        teacher_location, group_location = self.teacher_location[t], self.group_location[g]
+        moves = (((teacher_location >= 0) & (locations != teacher_location)).astype(np.int64) +
+                 ((group_location >= 0) & (locations != group_location)))
+        cost = problem.excess_penalty[c, valid_rooms] + moves * LOCATION_CHANGE_PENALTY
+        cost = np.where(free, cost[:, None], np.iinfo(np.int64).max)
+        candidates = np.argwhere(cost == cost.min())
+        i, j = candidates[rng.integers(len(candidates))]
+        return valid_rooms[i], slots[j]
+
+    def place(self, c, room, slot, count=1):
+        problem = self.problem
+        t, g = problem.course_teacher[c], problem.course_group[c]
+        conflicts = problem.slot_conflicts[slot]
+        if count > 0:
+            self.room_load[room] += conflicts
+            self.teacher_load[t] += conflicts
+            self.group_load[g] += conflicts
+            self.teacher_location[t] = self.group_location[g] = problem.room_location[room]
+        else:
+            self.room_load[room] -= conflicts
+            self.teacher_load[t] -= conflicts
+            self.group_load[g] -= conflicts
+
+    def remove(self, c, room, slot):
+        self.place(c, room, slot, count=-1)
+
+
+# Khởi tạo lịch có lan truyền ràng buộc: xếp các môn khó trước (ít cặp phòng x slot khả thi nhất).
+# Mỗi lần đặt một buổi học, bảng chiếm dụng được cập nhật ngay nên các môn sau chỉ chọn trong những
+# cặp còn khả thi (xem Occupancy.best_free). Môn không còn lựa chọn nào thì để trống (-1).
+# Khi xếp lại từ lịch cũ (base_genes): các môn cố định (fixed) giữ nguyên gen và được đặt trước,
+# các môn còn lại giữ vị trí cũ nếu vẫn còn trống, nếu không mới chọn vị trí mới như trên.
+def greedy_schedule(problem, rng, base_genes=None, fixed=None):
+    n_rooms = problem.n_rooms
+    genes = np.full(problem.n_courses, UNASSIGNED, dtype=GENE_DTYPE)
+    occupancy = Occupancy(problem)
+
+    # Môn ít lựa chọn xếp trước, các môn khó ngang nhau được xáo trộn ngẫu nhiên
+    order = np.lexsort((rng.random(problem.n_courses), problem.course_options))
+    if base_genes is not None:
+        fixed = np.zeros(problem.n_courses, dtype=bool) if fixed is None else fixed
+        order = np.concatenate([np.flatnonzero(fixed & (base_genes >= 0)), order[~fixed[order]]])
+    for c in order:
+        if not problem.course_options[c]:
+            continue
+        placement = None
+        if base_genes is not None and base_genes[c] >= 0:
+            placement = base_genes[c] % n_rooms, base_genes[c] // n_rooms
+            if not fixed[c] and not occupancy.is_free(c, *placement):
+                placement = None
+        if placement is None:
+            placement = occupancy.best_free(c, rng)
+            if placement is None:
+                continue
+        room, slot = placement
+        genes[c] = slot * n_rooms + room
+        occupancy.place(c, room, slot)
+    return genes
+
+
+# Toán tử sửa lịch: dựng bảng chiếm dụng của cả lịch, rồi lần lượt (theo thứ tự ngẫu nhiên) chuyển từng
+# môn còn bị trùng sang cặp phòng x slot còn trống tốt nhất. Không còn chỗ trống thì giữ nguyên
+# (fitness chịu phạt CLASH_PENALTY), hoặc bỏ xếp nếu drop.
+# movable: mặt nạ các môn được phép đổi (None = tất cả); môn cố định chỉ bị bỏ xếp (nếu drop) khi vẫn còn
+# trùng sau khi đã chuyển các môn khác.
+# Sửa trực tiếp trên genes, trả về True nếu có gen thay đổi.
+def repair(problem, genes, rng, movable=None, drop=False):
+    n_rooms = problem.n_rooms
+    occupancy = Occupancy(problem, genes)
+    placed = np.flatnonzero(genes >= 0)
+    rooms, slots = split_genes(problem, genes[placed])
+    clashing = ((occupancy.room_load[rooms, slots] > 1) |
+                (occupancy.teacher_load[problem.course_teacher[placed], slots] > 1) |
+                (occupancy.group_load[problem.course_group[placed], slots] > 1))
+    order = rng.permutation(placed[clashing])
+    if movable is not None:
+        order = np.concatenate([order[movable[order]], order[~movable[order]]])
+    changed = False
+    for c in order:
+        room, slot = genes[c] % n_rooms, genes[c] // n_rooms
+        # Môn có thể đã hết trùng sau khi các môn trước được chuyển đi
+        if occupancy.load(c, room, slot) <= 1:
+            continue
+        occupancy.remove(c, room, slot)
+        placement = occupancy.best_free(c, rng) if movable is None or movable[c] else None
+        if placement is None:
+            if drop:
+                genes[c] = UNASSIGNED
+                changed = True
+            else:
+                occupancy.place(c, room, slot)
+            continue
+        room, slot = placement
+        genes[c] = slot * n_rooms + room
+        occupancy.place(c, room, slot)
+        changed = True
+    return changed
+
+
+# Đếm số buổi học bị chồng lấn của từng cá thể trên một loại tài nguyên (phòng/giáo viên/nhóm).
+# Quét theo thời gian bắt đầu: buổi học nào bắt đầu trước khi các buổi trước đó của cùng tài nguyên
+# kết thúc thì bị tính là trùng (tức số buổi trừ số cụm chồng lấn rời nhau).
+def _count_overlaps(resource, begin, finish, assigned):
+    n_courses = resource.shape[-1]
+    # Buổi chưa xếp được đẩy ra sau cùng với độ dài 0 nên không bao giờ bị tính trùng
+    unassigned = (resource.max(initial=0) + 1) * WEEK_MINUTES + np.arange(n_courses)
+    start_keys = np.where(assigned, resource * WEEK_MINUTES + begin, unassigned)
+    end_keys = np.where(assigned, resource * WEEK_MINUTES + finish, unassigned)
+    order = np.argsort(start_keys, axis=1, kind="stable")
+    start_keys = np.take_along_axis(start_keys, order, axis=1)
+    end_keys = np.maximum.accumulate(np.take_along_axis(end_keys, order, axis=1), axis=1)
+    return (start_keys[:, 1:] < end_keys[:, :-1]).sum(axis=1)
+
+
+# Số buổi bị chồng lấn trong một nhóm nhỏ các buổi học của cùng một tài nguyên
+def _overlaps(begin, finish):
+    if begin.size < 2:
+        return 0
+    order = np.argsort(begin, kind="stable")
+    return int((begin[order][1:] < np.maximum.accumulate(finish[order])[:-1]).sum())
+
+
+# Đếm số lần đổi vị trí giữa các buổi liên tiếp (theo thời gian) của cùng một giáo viên/nhóm
+def _count_location_changes(entity, slots, locations, assigned, n_slots):
+    no_entry = np.iinfo(np.int64).max
+    keys = np.where(assigned, entity * n_slots + slots, no_entry)
+    order = np.argsort(keys, axis=1, kind="stable")
+    keys = np.take_along_axis(keys, order, axis=1)
+    locations = np.take_along_axis(locations, order, axis=1)
+    same_entity = (keys[:, 1:] // n_slots == keys[:, :-1] // n_slots) & (keys[:, 1:] != no_entry)
+    return (same_entity & (locations[:, 1:] != locations[:, :-1])).sum(axis=1)
+
+
+# Hàm tính các thành phần fitness của toàn bộ quần thể trong một lượt tính toán vector hóa
+def batch_components(problem, population):
+    population = np.atleast_2d(population)
+    assigned = population >= 0
+    genes = np.where(assigned, population, 0)
+    rooms, slots = split_genes(problem, genes)
+    n_slots = problem.n_slots
+    course_teacher = problem.course_teacher
+    course_group = problem.course_group
+
+    components = np.empty((population.shape[0], N_COMPONENTS), dtype=np.int64)
+    # Trùng phòng, trùng giáo viên, trùng nhóm sinh viên: các buổi học chồng lấn về thời gian
+    begin, finish = problem.slot_begin[slots], problem.slot_finish[slots]
+    components[:, ROOM_CLASHES] = _count_overlaps(rooms, begin, finish, assigned)
+    components[:, TEACHER_CLASHES] = _count_overlaps(np.broadcast_to(course_teacher, rooms.shape), begin, finish, assigned)
+    components[:, GROUP_CLASHES] = _count_overlaps(np.broadcast_to(course_group, rooms.shape), begin, finish, assigned)
+    components[:, ASSIGNED] = assigned.sum(axis=1)
+
+    locations = problem.room_location[rooms]
+    components[:, LOCATION_CHANGES] = (
+        _count_location_changes(course_teacher, slots, locations, assigned, n_slots) +
+        _count_location_changes(course_group, slots, locations, assigned, n_slots)
+    )
+    components[:, EXCESS] = (problem.excess_penalty[np.arange(population.shape[1]), rooms] * assigned).sum(axis=1)
+    return components
+
+
+# Tổng số lần trùng (phòng, giáo viên, nhóm) của từng cá thể; lịch hợp lệ là lịch không có trùng
+def clash_counts(components):
+    return np.atleast_2d(components)[:, ROOM_CLASHES:GROUP_CLASHES + 1].sum(axis=1)
+
+
+# Hàm quy đổi các thành phần thành điểm fitness. Mỗi lần trùng bị phạt CLASH_PENALTY điểm (phạt mềm)
+# để thuật toán vẫn đi qua được các lịch có trùng; chỉ lịch rỗng bị coi là không hợp lệ (-inf).
+def score_components(components):
+    components = np.atleast_2d(components)
+    score = (components[:, ASSIGNED] * SCHEDULED_REWARD
+             - components[:, LOCATION_CHANGES] * LOCATION_CHANGE_PENALTY
+             - components[:, EXCESS]
+             - clash_counts(components) * CLASH_PENALTY).astype(float)
+    score[components[:, ASSIGNED] == 0] = -np.inf
+    return score
+
+
+# Hàm đánh giá toàn bộ quần thể
+def batch_fitness(problem, population):
+    return score_components(batch_components(problem, population))
+
+
+# Số buổi bị chồng lấn giữa các gen (đã xếp) của một tài nguyên
+def _gene_overlaps(problem, genes):
+    slots = genes[genes >= 0] // problem.n_rooms
+    return _overlaps(problem.slot_begin[slots], problem.slot_finish[slots])
+
+
+# Số lần đổi vị trí của một giáo viên/nhóm, xét các môn của họ theo thứ tự thời gian
+def _entity_location_changes(problem, genes):
+    genes = genes[genes >= 0].astype(np.int64)
+    if genes.size < 2:
+        return 0
+    order = np.argsort(genes // problem.n_rooms, kind="stable")
+    locations = problem.room_location[genes[order] % problem.n_rooms]
+    return int((locations[1:] != locations[:-1]).sum())
+
+
+# Đánh giá tăng dần: thay đổi của các thành phần fitness khi gen của môn course đổi thành new_gene.
+# Chỉ xét các tài nguyên bị ảnh hưởng: phòng cũ/mới, các môn của cùng giáo viên và cùng nhóm.
+def delta_components(problem, genes, course, new_gene):
+    delta = np.zeros(N_COMPONENTS, dtype=np.int64)
+    old_gene = int(genes[course])
+    if old_gene == new_gene:
+        return delta
+    n_rooms = problem.n_rooms
+    old = old_gene if old_gene >= 0 else None
+    new = new_gene if new_gene >= 0 else None
+
+    # Phòng: đếm lại chồng lấn trong phòng cũ và phòng mới
+    rooms = np.where(genes >= 0, genes % n_rooms, -1)
+    for room in {g % n_rooms for g in (old, new) if g is not None}:
+        members = np.flatnonzero(rooms == room)
+        member_genes = genes[members].astype(np.int64)
+        before = _gene_overlaps(problem, member_genes)
+        member_genes[members == course] = UNASSIGNED
+        if new is not None and new % n_rooms == room:
+            member_genes = np.append(member_genes, new)
+        delta[ROOM_CLASHES] += _gene_overlaps(problem, member_genes) - before
+
+    for index, entity_courses, clash_component in (
+        (problem.course_teacher[course], problem.teacher_courses, TEACHER_CLASHES),
+        (problem.course_group[course], problem.group_courses, GROUP_CLASHES),
+    ):
+        if index < 0:
+            continue
+        members = entity_courses[index]
+        member_genes = genes[members].astype(np.int64)
+        overlaps_before = _gene_overlaps(problem, member_genes)
+        changes_before = _entity_location_changes(problem, member_genes)
+        member_genes[np.searchsorted(members, course)] = new_gene
+        delta[clash_component] = _gene_overlaps(problem, member_genes) - overlaps_before
+        delta[LOCATION_CHANGES] += _entity_location_changes(problem, member_genes) - changes_before
+
+    delta[ASSIGNED] = (new is not None) - (old is not None)
+    delta[EXCESS] = (
+        (problem.excess_penalty[course, new % n_rooms] if new is not None else 0) -
+        (problem.excess_penalty[course, old % n_rooms] if old is not None else 0)
+    )
+    return delta
+
+
+# Bọc hàm đánh giá để đếm số cá thể được đánh giá đầy đủ (không tính các con cập nhật tăng dần).
+# Nằm dưới FitnessCache (nếu có) nên các lần trúng cache không được đếm.
+class EvaluationCounter:
+    def __init__(self, evaluate):
+        self.evaluate = evaluate
+        self.count = 0
+
+    def __call__(self, population):
+        self.count += population.shape[0]
+        return self.evaluate(population)
+
+
+# Bộ nhớ đệm fitness (LRU có giới hạn), khóa là mã băm của mảng gen đã mã hóa.
+# Các cá thể con trùng nhau (do lai ghép/đột biến tạo lại lịch cũ) không phải tính lại.
+class FitnessCache:
+    # evaluate: hàm trả về mảng thành phần fitness (số cá thể x N_COMPONENTS)
+    def __init__(self, evaluate, maxsize=50000):
+        self.evaluate = evaluate
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, population):
+        components = np.empty((population.shape[0], N_COMPONENTS), dtype=np.int64)
+        missing = {}
+        for i, genes in enumerate(population):
+            key = hash(genes.tobytes())
+            value = self.entries.get(key)
+            if value is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                self.entries.move_to_end(key)
+                components[i] = value
+        self.misses += len(missing)
+        self.hits += population.shape[0] - len(missing)
+        if missing:
+            # Mỗi lịch chưa có trong cache chỉ được tính một lần dù xuất hiện nhiều lần
+            first = [rows[0] for rows in missing.values()]
+            values = self.evaluate(population[first])
+            for (key, rows), value in zip(missing.items(), values):
+                components[rows] = value
+                self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return components
+
+
+# Bài toán của tiến trình con: nhận một lần khi khởi tạo pool, không gửi lại mỗi thế hệ
+_worker_problem = None
+_worker_evaluate = None
+_worker_counter = None
+
+
+def _init_worker(problem, cache_size=0):
+    global _worker_problem, _worker_evaluate, _worker_counter
+    _worker_problem = problem
+    _worker_counter = EvaluationCounter(lambda pop: batch_components(problem, pop))
+    _worker_evaluate = FitnessCache(_worker_counter, cache_size) if cache_size else _worker_counter
+
+
+def _worker_components(population):
+    return batch_components(_worker_problem, population)
+
+
+# Đánh giá song song: chia quần thể thành các phần đều nhau cho các tiến trình con
+class ParallelEvaluator:
+    def __init__(self, problem, workers):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(problem,))
+
+    # Không gửi phần rỗng: mỗi thế hệ thường chỉ còn vài cá thể chưa có trong cache
+    def __call__(self, population):
+        if not population.shape[0]:
+            return np.empty((0, N_COMPONENTS), dtype=np.int64)
+        chunks = np.array_split(population, min(self.workers, population.shape[0]))
+        return np.concatenate(list(self.pool.map(_worker_components, chunks)))
+
+    def close(self):
+        self.pool.shutdown()
+
+
+# Đột biến: chọn một môn đã xếp, chuyển sang khung giờ đủ dài đầu tiên và một phòng hợp lệ ngẫu nhiên.
+# movable: mặt nạ các môn được phép đổi (None = tất cả).
+# Trả về (môn, gen mới) hoặc None nếu không đột biến được.
+def pick_mutation(problem, genes, rng, movable=None):
+    placed = np.flatnonzero(genes >= 0 if movable is None else (genes >= 0) & movable)
+    if not placed.size:
+        return None
+    c = placed[rng.integers(placed.size)]
+    valid_rooms = problem.course_rooms[c]
+    slots = problem.course_slots[c]
+    if not (valid_rooms.size and slots.size):
+        return None
+    return c, int(slots[0] * problem.n_rooms + valid_rooms[rng.integers(valid_rooms.size)])
+
+
+# Sắp xếp quần thể theo fitness giảm dần
+def _sort_population(population, components):
+    fitness = score_components(components)
+    order = np.argsort(-fitness, kind="stable")
+    return population[order], components[order], fitness[order]
+
+
+# Các cách chọn cha mẹ và lai ghép được hỗ trợ
+SELECTIONS = ("truncation", "tournament", "rank")
+CROSSOVERS = ("midpoint", "uniform", "multipoint")
+
+
+# Bộ sinh thế hệ mới. Hai bộ đệm quần thể được cấp phát một lần và dùng luân phiên giữa các thế hệ,
+# mọi bước chọn lọc/lai ghép đều là thao tác mảng nên không tạo đối tượng Python cho từng cá thể con.
+# Con luôn được chép vào bộ đệm riêng, đột biến con không làm hỏng cá thể ưu tú hay cha mẹ.
+#   selection: "truncation" (ngẫu nhiên trong parent_pool cá thể tốt nhất), "tournament"
+#              (thắng trong tournament_size cá thể ngẫu nhiên), "rank" (xác suất tuyến tính theo thứ hạng)
+#   crossover: "midpoint" (cắt ở giữa), "uniform" (từng gen lấy ngẫu nhiên từ cha hoặc mẹ),
+#              "multipoint" (crossover_points điểm cắt ngẫu nhiên)
+#   repair_rate: xác suất một con bị trùng được sửa bằng toán tử repair sau khi đánh giá
+#   profiler: đo thời gian các giai đoạn selection, crossover, mutation, repair (xem profiling.Profiler)
+class Breeder:
+    def __init__(self, problem, population_size, mutation_rate=0.1, crossover_rate=1.0, elite_size=10,
+                 parent_pool=50, selection="truncation", tournament_size=3, crossover="midpoint",
+                 crossover_points=2, repair_rate=0.05, fixed=None, profiler=None):
+        if selection not in SELECTIONS:
+            raise ValueError(f"Cách chọn lọc không hợp lệ: {selection}")
+        if crossover not in CROSSOVERS:
+            raise ValueError(f"Cách lai ghép không hợp lệ: {crossover}")
+        self.problem = problem
+        self.profiler = profiler or NO_PROFILER
+        # Các môn cố định (khi xếp lại từ lịch cũ) không bao giờ bị đột biến
+        self.movable = None if fixed is None else ~np.asarray(fixed, dtype=bool)
+        self.mutation_rate = mutation_rate
+        self.crossover_rate = crossover_rate
+        self.repair_rate = repair_rate
+        self.elite_size = min(elite_size, population_size)
+        self.pool = min(parent_pool, population_size)
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.crossover = crossover
+        self.crossover_points = min(crossover_points, max(problem.n_courses - 1, 1))
+
+        n_children = population_size - self.elite_size
+        n_courses = problem.n_courses
+        self.populations = [np.empty((population_size, n_courses), dtype=GENE_DTYPE) for _ in range(2)]
+        self.components = [np.empty((population_size, N_COMPONENTS), dtype=np.int64) for _ in range(2)]
+        self.current = 0
+        self.second_parents = np.empty((n_children, n_courses), dtype=GENE_DTYPE)
+        self.mask = np.empty((n_children, n_courses), dtype=bool)
+        self.uniform = np.empty((n_children, n_courses))
+        self.pending = np.zeros(population_size, dtype=bool)
+        # Linear ranking: cá thể hạng r (0 = tốt nhất) có trọng số population_size - r
+        weights = np.arange(population_size, 0, -1, dtype=float)
+        self.rank_probabilities = weights / weights.sum()
+
+    # Chọn n cặp cha mẹ (chỉ số trong quần thể hiện tại)
+    def _select(self, fitness, n, rng):
+        size = fitness.size
+        if self.selection == "tournament":
+            candidates = rng.integers(size, size=(2 * n, self.tournament_size))
+            winners = candidates[np.arange(2 * n), np.argmax(fitness[candidates], axis=1)]
+            return winners[:n], winners[n:]
+        if self.selection == "rank":
+            order = np.argsort(-fitness, kind="stable")
+            picks = order[rng.choice(size, size=2 * n, p=self.rank_probabilities)]
+            return picks[:n], picks[n:]
+        # Hai cha mẹ khác nhau trong nhóm tốt nhất
+        pool = _top_indices(fitness, self.pool)
+        first = rng.integers(pool.size, size=n)
+        second = (first + rng.integers(1, max(pool.size, 2), size=n)) % pool.size
+        return pool[first], pool[second]
+
+    # Điền mặt nạ lai ghép: True = gen lấy từ cha/mẹ thứ hai
+    def _fill_mask(self, rng):
+        mask = self.mask
+        n_children, n_courses = mask.shape
+        if self.crossover == "uniform":
+            rng.random(out=self.uniform)
+            np.less(self.uniform, 0.5, out=mask)
+        elif self.crossover == "multipoint":
+            # Số điểm cắt đứng trước mỗi vị trí là lẻ thì gen thuộc về cha/mẹ thứ hai
+            points = rng.integers(1, max(n_courses, 2), size=(n_children, self.crossover_points))
+            cuts = np.zeros((n_children, n_courses + 1), dtype=np.int8)
+            np.add.at(cuts, (np.arange(n_children)[:, None], points), 1)
+            np.bitwise_and(np.cumsum(cuts[:, :-1], axis=1, dtype=np.int8), 1, out=cuts[:, :-1])
+            np.not_equal(cuts[:, :-1], 0, out=mask)
+        else:
+            mask[:] = False
+            mask[:, n_courses // 2:] = True
+
+    # Tạo thế hệ mới từ quần thể hiện tại (không cần sắp xếp): giữ nhóm ưu tú, lai ghép rồi đột biến.
+    # Con không lai ghép là bản sao của cha/mẹ: fitness được cập nhật tăng dần khi đột biến.
+    # Trả về (quần thể mới, thành phần fitness, mặt nạ các cá thể cần đánh giá lại từ đầu);
+    # hai mảng trả về là bộ đệm của Breeder và sẽ bị ghi đè ở lần gọi breed() kế tiếp.
+    def breed(self, population, components, fitness, rng):
+        self.current ^= 1
+        new_population, new_components = self.populations[self.current], self.components[self.current]
+        elite_size = self.elite_size
+        n_children = new_population.shape[0] - elite_size
+        profiler = self.profiler
+
+        children = new_population[elite_size:]
+        child_components = new_components[elite_size:]
+        with profiler.phase("selection"):
+            elites = _top_indices(fitness, elite_size)
+            np.take(population, elites, axis=0, out=new_population[:elite_size])
+            np.take(components, elites, axis=0, out=new_components[:elite_size])
+            parent1, parent2 = self._select(fitness, n_children, rng)
+
+        with profiler.phase("crossover"):
+            crossed = rng.random(n_children) < self.crossover_rate
+            np.take(population, parent1, axis=0, out=children)
+            np.take(components, parent1, axis=0, out=child_components)
+            np.take(population, parent2, axis=0, out=self.second_parents)
+            self._fill_mask(rng)
+            self.mask[~crossed] = False
+            np.copyto(children, self.second_parents, where=self.mask)
+
+        with profiler.phase("mutation"):
+            for i in np.flatnonzero(rng.random(n_children) < self.mutation_rate):
+                move = pick_mutation(self.problem, children[i], rng, self.movable)
+                if move is None:
+                    continue
+                if not crossed[i]:
+                    child_components[i] += delta_components(self.problem, children[i], *move)
+                children[i, move[0]] = move[1]
+        self.pending[elite_size:] = crossed
+        return new_population, new_components, self.pending
+
+    # Sửa các con bị trùng (đã có thành phần fitness), mỗi con với xác suất repair_rate; nhóm ưu tú giữ nguyên.
+    # Trả về chỉ số các cá thể đã thay đổi, cần đánh giá lại.
+    def repair(self, population, components, rng):
+        if not self.repair_rate:
+            return np.empty(0, dtype=np.int64)
+        with self.profiler.phase("repair"):
+            clashing = clash_counts(components[self.elite_size:]) > 0
+            clashing &= rng.random(clashing.size) < self.repair_rate
+            rows = np.flatnonzero(clashing) + self.elite_size
+            changed = [i for i in rows if repair(self.problem, population[i], rng, self.movable)]
+        return np.array(changed, dtype=np.int64)
+
+
+# Chỉ số của k cá thể có fitness cao nhất (không theo thứ tự), dùng argpartition thay cho sắp xếp
+def _top_indices(fitness, k):
+    if k >= fitness.size:
+        return np.arange(fitness.size)
+    return np.argpartition(-fitness, k - 1)[:k]
+
+
+# Các điều kiện dừng sớm. Mỗi thế hệ gọi update(); trả về lý do dừng hoặc None để chạy tiếp:
+#   "time_budget": hết thời gian cho phép (giây, tính theo đồng hồ thực)
+#   "patience": fitness tốt nhất không cải thiện sau patience thế hệ
+#   "target": đạt fitness mục tiêu
+#   "diversity": tỉ lệ lịch khác nhau trong quần thể thấp hơn min_diversity
+#   "cancelled": người dùng hủy (cancel là một threading.Event đã được set)
+class EarlyStopping:
+    def __init__(self, time_budget=None, patience=None, target_fitness=None, min_diversity=None, deadline=None,
+                 cancel=None):
+        self.deadline = deadline or (time.time() + time_budget if time_budget else None)
+        self.cancel = cancel
+        self.patience = patience
+        self.target_fitness = target_fitness
+        self.min_diversity = min_diversity
+        self.best = -np.inf
+        self.stale = 0
+
+    def update(self, population, fitness, generations=1):
+        if self.cancel is not None and self.cancel.is_set():
+            return "cancelled"
+        best = fitness.max()
+        if best > self.best:
+            self.best = best
+            self.stale = 0
+        else:
+            self.stale += generations
+        if self.target_fitness is not None and self.best >= self.target_fitness:
+            return "target"
+        if self.patience and self.stale >= self.patience:
+            return "patience"
+        if self.min_diversity:
+            unique = len({hash(genes.tobytes()) for genes in population})
+            if unique / population.shape[0] < self.min_diversity:
+                return "diversity"
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "time_budget"
+        return None
+
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    # Hết thời gian hoặc người dùng đã hủy (xét giữa các bước dài ngoài vòng lặp thế hệ)
+    def interrupted(self):
+        return (self.cancel is not None and self.cancel.is_set()) or self.expired()
+
+
+# Tiến hóa một quần thể qua tối đa generations thế hệ. Quần thể chỉ được sắp xếp một lần khi kết thúc.
+# on_generation(số thế hệ, quần thể, thành phần, fitness) được gọi lúc bắt đầu và sau mỗi thế hệ.
+# Trả về (quần thể, thành phần, fitness đã sắp xếp giảm dần, số thế hệ đã chạy, lý do dừng hoặc None nếu chạy đủ).
+def evolve(problem, population, components, fitness, rng, generations, evaluate, stopping=None,
+           on_generation=None, profiler=None, **params):
+    profiler = profiler or NO_PROFILER
+    breeder = Breeder(problem, population.shape[0], profiler=profiler, **params)
+    done = 0
+    reason = None
+    if on_generation:
+        on_generation(done, population, components, fitness)
+    while done < generations:
+        if fitness.max() == -np.inf:
+            reason = "infeasible"
+            break
+        with profiler.phase("stopping"):
+            reason = stopping.update(population, fitness) if stopping else None
+        if reason:
+            break
+        population, components, pending = breeder.breed(population, components, fitness, rng)
+        # Nhóm ưu tú và các con chỉ đột biến đã có thành phần fitness, chỉ đánh giá các con lai ghép
+        with profiler.phase("evaluation"):
+            rows = np.flatnonzero(pending)
+            if rows.size:
+                components[rows] = evaluate(population[rows])
+        rows = breeder.repair(population, components, rng)
+        with profiler.phase("evaluation"):
+            if rows.size:
+                components[rows] = evaluate(population[rows])
+            fitness = score_components(components)
+        done += 1
+        if profiler.enabled:
+            profiler.generation(done, population, fitness, int((clash_counts(components) > 0).sum()))
+        if on_generation:
+            with profiler.phase("callback"):
+                on_generation(done, population, components, fitness)
+    with profiler.phase("sort"):
+        population, components, fitness = _sort_population(population, components)
+    return population, components, fitness, done, reason
+
+
+# Quần thể ban đầu: các cá thể mồi (seeds, ví dụ nhóm ưu tú của lần chạy trước) rồi bổ sung bằng xếp lịch tham lam
+# (xuất phát từ base_genes, giữ nguyên các môn fixed nếu xếp lại từ lịch cũ).
+# stopping: EarlyStopping của lần chạy; hết thời gian hoặc bị hủy thì ngừng xếp lịch mới (đã có ít nhất một
+# cá thể), các hàng còn lại là bản sao của các cá thể đã tạo. on_seed(số cá thể đã có, population_size)
+# được gọi sau mỗi lịch tham lam.
+def build_population(problem, rng, population_size, seeds=None, base_genes=None, fixed=None, stopping=None,
+                     on_seed=None):
+    population = np.empty((population_size, problem.n_courses), dtype=GENE_DTYPE)
+    n_seeds = 0
+    if seeds is not None and len(seeds):
+        seeds = np.asarray(seeds, dtype=GENE_DTYPE)[:population_size]
+        if seeds.ndim != 2 or seeds.shape[1] != problem.n_courses:
+            raise ValueError(f"Cá thể mồi phải có {problem.n_courses} gen")
+        n_seeds = seeds.shape[0]
+        population[:n_seeds] = seeds
+    built = n_seeds
+    while built < population_size:
+        if built and stopping is not None and stopping.interrupted():
+            population[built:] = population[np.arange(built, population_size) % built]
+            break
+        population[built] = greedy_schedule(problem, rng, base_genes, fixed)
+        built += 1
+        if on_seed:
+            on_seed(built, population_size)
+    return population
+
+
+# Tiến trình con của mô hình đảo: chạy một giai đoạn (giữa hai lần di cư) cho một đảo.
+# Các điều kiện dừng khác được xét ở tiến trình chính sau mỗi giai đoạn, ở đây chỉ xét hạn thời gian.
+# Ở giai đoạn đầu (components là None) population chứa các cá thể mồi của đảo.
+def _island_epoch(population, components, rng, generations, population_size, deadline, base_genes, params):
+    cache = _worker_evaluate if isinstance(_worker_evaluate, FitnessCache) else None
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    evaluations = _worker_counter.count
+    evaluate = _worker_evaluate
+    stopping = EarlyStopping(deadline=deadline) if deadline else None
+    if components is None:
+        population = build_population(_worker_problem, rng, population_size, population, base_genes,
+                                      params.get("fixed"), stopping)
+        components = evaluate(population)
+    population, components, fitness = _sort_population(population, components)
+    population, components, fitness, done, reason = evolve(_worker_problem, population, components, fitness, rng,
+                                                           generations, evaluate, stopping, **params)
+    if cache:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return population, components, rng, done, reason, hits, misses, _worker_counter.count - evaluations
+
+
+# Mô hình đảo: các quần thể con tiến hóa độc lập trong các tiến trình riêng, cứ sau
+# migration_interval thế hệ thì các cá thể tốt nhất của mỗi đảo di cư sang đảo kế tiếp (vòng tròn).
+# on_generation và yêu cầu hủy chỉ được xử lý ở tiến trình chính, sau mỗi giai đoạn.
+def _run_islands(problem, population_size, generations, seed, islands, migration_interval, migration_size,
+                 cache_size, stopping, on_generation, seeds, base_genes, params, stats, profiler):
+    # Mỗi đảo có bộ sinh số ngẫu nhiên riêng nên kết quả chỉ phụ thuộc vào seed
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(islands)]
+    # Các cá thể mồi được chia lần lượt cho các đảo
+    populations = [None if seeds is None else seeds[i::islands] for i in range(islands)]
+    components = [None] * islands
+    # Mỗi đảo giữ lại ít nhất một cá thể của chính nó; 0 = không di cư
+    migration_size = max(0, min(migration_size, population_size - 1))
+    done = 0
+    reason = None
+    with ProcessPoolExecutor(max_workers=min(islands, os.cpu_count() or 1),
+                             initializer=_init_worker, initargs=(problem, cache_size)) as pool:
+        while True:
+            epoch = min(migration_interval, generations - done)
+            with profiler.phase("islands"):
+                futures = [
+                    pool.submit(_island_epoch, populations[i], components[i], rngs[i], epoch, population_size,
+                                stopping.deadline, None if components[i] is not None else base_genes, params)
+                    for i in range(islands)
+                ]
+                results = [f.result() for f in futures]
+            populations = [r[0] for r in results]
+            components = [r[1] for r in results]
+            best_fitness = [score_components(comp[0])[0] for comp in components]
+            rngs = [r[2] for r in results]
+            stats["cache_hits"] += sum(r[5] for r in results)
+            stats["cache_misses"] += sum(r[6] for r in results)
+            stats["evaluations"] += sum(r[7] for r in results)
+            done += max(r[3] for r in results)
+            if profiler.enabled:
+                # Chế độ đảo chỉ ghi số liệu sau mỗi kỳ di cư (trên quần thể gộp của mọi đảo)
+                combined = np.concatenate(components)
+                profiler.generation(done, np.concatenate(populations), score_components(combined),
+                                    int((clash_counts(combined) > 0).sum()))
+            if on_generation:
+                on_generation(done, np.concatenate(populations), np.concatenate(components),
+                              score_components(np.concatenate(components)))
+            if all(f == -np.inf for f in best_fitness):
+                reason = "infeasible"
+            elif any(r[4] == "time_budget" for r in results):
+                reason = "time_budget"
+            else:
+                order = np.argsort(best_fitness)[::-1]
+                reason = stopping.update(np.concatenate(populations), np.array(best_fitness)[order], epoch)
+            if reason or done >= generations:
+                break
+            if not migration_size:
+                continue
+            # Di cư: migration_size cá thể tốt nhất của đảo i thay cho các cá thể kém nhất của đảo i + 1
+            with profiler.phase("migration"):
+                migrants = [(pop[:migration_size].copy(), comp[:migration_size].copy())
+                            for pop, comp in zip(populations, components)]
+                for i in range(islands):
+                    target = (i + 1) % islands
+                    pop, comp = populations[target], components[target]
+                    pop[-migration_size:], comp[-migration_size:] = migrants[i]
+                    populations[target], components[target], _ = _sort_population(pop, comp)
+
+    population, components, fitness = _sort_population(np.concatenate(populations), np.concatenate(components))
+    return population, components, fitness, done, reason
+
+
+# Tiến độ của một thế hệ: fitness tốt nhất/trung bình (bỏ qua lịch có xung đột), số xung đột trung bình
+# mỗi cá thể và của cá thể tốt nhất, tốc độ chạy và bản sao gen của cá thể tốt nhất (để lấy lịch tốt nhất
+# tới hiện tại)
+def _progress(done, population, components, fitness, elapsed):
+    best = int(np.argmax(fitness))
+    clashes = clash_counts(components)
+    feasible = fitness[(clashes == 0) & np.isfinite(fitness)]
+    return {
+        "generation": done,
+        "best_fitness": float(fitness[best]),
+        "best_conflicts": int(clashes[best]),
+        "mean_fitness": float(feasible.mean()) if feasible.size else float("nan"),
+        "conflicts": float(clashes.mean()),
+        "elapsed": elapsed,
+        "generations_per_second": done / elapsed if elapsed > 0 else 0.0,
+        "best": population[best].copy(),
+    }
+
+
+# Thuật toán di truyền trên quần thể mã hóa số nguyên.
+# Dừng khi chạy đủ generations thế hệ hoặc khi một điều kiện dừng sớm thỏa mãn
+# (time_budget giây, patience thế hệ không cải thiện, đạt target_fitness, đa dạng < min_diversity);
+# lý do dừng được ghi vào stats["stop_reason"]. Đặt cancel (threading.Event) để dừng giữa chừng và
+# nhận lịch tốt nhất tới lúc đó; on_generation(progress) nhận tiến độ mỗi thế hệ (xem _progress).
+# initial_population: các cá thể mồi cho quần thể ban đầu; keep_elites > 0 thì stats["elites"] chứa
+# gen (dạng list) của keep_elites cá thể tốt nhất cuối cùng, dùng để khởi động lần chạy sau.
+# Lịch có trùng chỉ bị phạt (xem score_components); repair_rate là xác suất sửa một con bị trùng mỗi thế hệ,
+# lịch trả về luôn được sửa hết trùng (stats["dropped"]: số môn phải bỏ xếp vì không còn chỗ trống).
+# base_genes/fixed: xếp lại từ lịch cũ, các môn fixed giữ nguyên gen của base_genes trong suốt quá trình.
+# profiler: profiling.Profiler để đo thời gian từng giai đoạn và ghi số liệu theo thế hệ (mặc định tắt).
+# on_seed(số cá thể đã tạo, population_size): tiến độ tạo quần thể ban đầu (lâu với bài toán lớn), trước thế hệ đầu
+# tiên; cancel cũng được xét giữa các cá thể. Chế độ đảo không báo tiến độ này.
+def run_ga(problem, population_size=100, generations=500, mutation_rate=0.1, crossover_rate=1.0,
+           elite_size=10, parent_pool=50, selection="truncation", tournament_size=3,
+           crossover="midpoint", crossover_points=2, repair_rate=0.05, seed=None, workers=1,
+           islands=1, migration_interval=50, migration_size=5, cache_size=50000,
+           time_budget=None, patience=None, target_fitness=None, min_diversity=None,
+           on_generation=None, cancel=None, initial_population=None, keep_elites=0, base_genes=None, fixed=None,
+           profiler=None, on_seed=None):
+    start = time.perf_counter()
+    profiler = profiler or NO_PROFILER
+    stats = {"fitness": -np.inf, "generations": 0, "elapsed": 0.0, "cache_hits": 0, "cache_misses": 0,
+             "evaluations": 0, "stop_reason": "infeasible"}
+    params = {"mutation_rate": mutation_rate, "crossover_rate": crossover_rate,
+              "elite_size": elite_size, "parent_pool": parent_pool, "selection": selection,
+              "tournament_size": tournament_size, "crossover": crossover, "crossover_points": crossover_points,
+              "repair_rate": repair_rate, "fixed": fixed}
+    stopping = EarlyStopping(time_budget, patience, target_fitness, min_diversity, cancel=cancel)
+    report = None
+    if on_generation:
+        def report(done, population, components, fitness):
+            on_generation(_progress(done, population, components, fitness, time.perf_counter() - start))
+
+    seeds = None if initial_population is None else np.asarray(initial_population, dtype=GENE_DTYPE)
+    if islands > 1:
+        # Chế độ đảo đã chạy song song theo đảo, bỏ qua tham số workers
+        if profiler.enabled:
+            profiler.counters = lambda: {key: stats[key] for key in ("evaluations", "cache_hits", "cache_misses")}
+        population, components, fitness, done, reason = _run_islands(problem, population_size, generations, seed,
+                                                                     islands, migration_interval, migration_size,
+                                                                     cache_size, stopping, report, seeds, base_genes,
+                                                                     params, stats, profiler)
+    else:
+        rng = np.random.default_rng(seed)
+        with profiler.phase("initialization"):
+            population = build_population(problem, rng, population_size, seeds, base_genes, fixed, stopping,
+                                          on_seed)
+        if not (population >= 0).any():
+            return None, stats
+        evaluator = ParallelEvaluator(problem, workers) if workers > 1 else None
+        evaluate = evaluator or (lambda pop: batch_components(problem, pop))
+        # Cache nằm ở tiến trình chính, chỉ các lịch chưa gặp mới được gửi đi đánh giá
+        counter = EvaluationCounter(evaluate)
+        cache = FitnessCache(counter, cache_size) if cache_size else None
+        evaluate = cache or counter
+        if profiler.enabled:
+            profiler.counters = lambda: {"evaluations": counter.count, "cache_hits": cache.hits if cache else 0,
+                                         "cache_misses": cache.misses if cache else 0}
+        try:
+            with profiler.phase("evaluation"):
+                population, components, fitness = _sort_population(population, evaluate(population))
+            population, components, fitness, done, reason = evolve(problem, population, components, fitness, rng,
+                                                                   generations, evaluate, stopping, report,
+                                                                   profiler, **params)
+        finally:
+            if evaluator:
+                evaluator.close()
+        stats["evaluations"] = counter.count
+        if cache:
+            stats.update(cache_hits=cache.hits, cache_misses=cache.misses)
+
+    best, best_fitness = population[0], fitness[0]
+    if keep_elites:
+        stats["elites"] = population[:keep_elites][np.isfinite(fitness[:keep_elites])].tolist()
+    # Lịch trả về không được có trùng: sửa lần cuối, môn vẫn không còn chỗ trống thì bỏ xếp
+    stats["dropped"] = 0
+    if clash_counts(components[0])[0]:
+        with profiler.phase("repair"):
+            best = best.copy()
+            movable = None if fixed is None else ~np.asarray(fixed, dtype=bool)
+            repair(problem, best, np.random.default_rng(seed), movable, drop=True)
+            stats["dropped"] = int(((population[0] >= 0) & (best < 0)).sum())
+            best_fitness = batch_fitness(problem, best)[0]
+    stats.update(fitness=float(best_fitness), generations=done, elapsed=time.perf_counter() - start,
+                 stop_reason=reason or "generations")
+    if best_fitness == -np.inf:
+        stats["stop_reason"] = "infeasible"
+        return None, stats
+    return best, stats
+
+
+# Hàm mã hóa lịch học (định dạng hiển thị, ví dụ lấy từ lịch sử) thành gen theo bài toán hiện tại.
+# Môn trùng tên được ghép theo thứ tự xuất hiện. Buổi học không còn hợp lệ (môn/phòng không còn,
+# phòng không đủ chỗ/thiết bị, khung giờ không còn nằm trong khung rảnh của giáo viên) thì để trống.
+def encode_schedule(problem, schedule):
+    genes = np.full(problem.n_courses, UNASSIGNED, dtype=GENE_DTYPE)
+    course_ids = {}
+    for c, course in enumerate(problem.courses):
+        course_ids.setdefault(course["name"], []).append(c)
+    for entry in schedule:
+        ids = course_ids.get(entry["Môn học"])
+        if not ids:
+            continue
+        c = ids.pop(0)
+        course = problem.courses[c]
+        room = problem.room_index.get(entry["Phòng học"], -1)
+        slot = problem.slot_index.get(entry["Thời gian"], -1)
+        if (entry.get("Giáo viên", course["teacher"]) != course["teacher"] or
+                entry.get("Nhóm sinh viên", course["group"]) != course["group"]):
+            continue
+        if room in problem.course_rooms[c] and slot in problem.course_slots[c]:
+            genes[c] = slot * problem.n_rooms + room
+    return genes
+
+
+# Hàm giải mã một cá thể thành danh sách lịch học (định dạng hiển thị)
+def decode_schedule(problem, genes):
+    schedule = []
+    rooms, slots = split_genes(problem, np.where(genes >= 0, genes, 0))
+    for c in np.flatnonzero(genes >= 0):
+        course = problem.courses[c]
+        room = problem.rooms[rooms[c]]
+        schedule.append({
+            "Môn học": course["name"], "Phòng học": room["name"],
+            "Giáo viên": course["teacher"], "Nhóm sinh viên": course["group"],
+            "Thời gian": problem.slot_names[slots[c]], "Location": room["location"]
+        })
+    return schedule
@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Cơ sở dữ liệu SQLite lưu lịch sử lịch học (mỗi lần tạo lịch là một dòng, đánh chỉ mục theo ngày)
+HISTORY_DB = "schedule_history.db"
+# File JSON lưu lịch sử theo cách cũ, được chuyển sang SQLite một lần duy nhất
+LEGACY_HISTORY_FILE = "schedule_history.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    schedule TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_day ON history (day, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Các kho (đường dẫn, file JSON cũ) đã được khởi tạo trong tiến trình này
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+# Hàm mở kết nối tới kho lịch sử. Lần mở đầu tiên trong tiến trình (hoặc khi file cơ sở dữ liệu chưa có)
+# tạo bảng nếu chưa có và chuyển dữ liệu JSON cũ (nếu có); các lần sau chỉ mở kết nối.
+def connect(db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    key = (os.path.abspath(db_path), legacy_file)
+    if key in _initialized and os.path.exists(db_path):
+        return sqlite3.connect(db_path, timeout=30)
+    with _init_lock:
+        conn = sqlite3.connect(db_path, timeout=30)
+        # WAL cho phép nhiều phiên Streamlit đọc trong khi một phiên đang ghi (lưu luôn trong file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if legacy_file:
+            migrate_legacy(conn, legacy_file)
+        _initialized.add(key)
+    return conn
+
+
+# Hàm đọc file JSON cũ: chấp nhận cả cấu trúc list và dictionary (một bản ghi) như load_history cũ
+def read_legacy(legacy_file):
+    if not os.path.exists(legacy_file):
+        return []
+    try:
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, ValueError):
+        return []
+    if isinstance(data, dict):
+        return [data]
+    if isinstance(data, list):
+        return data
+    return []
+
+
+# Hàm chuyển lịch sử từ file JSON cũ vào SQLite, chỉ làm một lần (đánh dấu trong bảng meta).
+# File JSON được giữ nguyên để có thể đối chiếu.
+def migrate_legacy(conn, legacy_file):
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+        return 0
+    # BEGIN IMMEDIATE giữ khóa ghi: hai phiên mở cùng lúc không chuyển dữ liệu hai lần
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            conn.rollback()
+            return 0
+        records = [
+            record for record in read_legacy(legacy_file)
+            if isinstance(record, dict) and "timestamp" in record and "schedule" in record
+        ]
+        conn.executemany(
+            "INSERT INTO history (day, timestamp, schedule) VALUES (?, ?, ?)",
+            [(record["timestamp"][:10], record["timestamp"], json.dumps(record["schedule"], ensure_ascii=False))
+             for record in records]
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                     (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(records)
+
+
+# Hàm thêm một lịch học vào lịch sử (một giao dịch INSERT, không ghi lại dữ liệu cũ)
+def append_history(schedule, timestamp=None, db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect(db_path, legacy_file)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO history (day, timestamp, schedule) VALUES (?, ?, ?)",
+                (timestamp[:10], timestamp, json.dumps(schedule, ensure_ascii=False))
+            )
+    finally:
+        conn.close()
+    return {"schedule": schedule, "timestamp": timestamp}
+
+
+# Hàm đếm số lịch học của một ngày
+def count_day(day, db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    conn = connect(db_path, legacy_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM history WHERE day = ?", (day,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+# Hàm liệt kê một trang các bản ghi của một ngày theo thứ tự tạo: chỉ id và thời gian tạo, không đọc nội dung lịch.
+# limit=None: lấy tới hết.
+def list_day(day, offset=0, limit=None, db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    conn = connect(db_path, legacy_file)
+    try:
+        rows = conn.execute(
+            "SELECT id, timestamp FROM history WHERE day = ? ORDER BY id LIMIT ? OFFSET ?",
+            (day, -1 if limit is None else limit, offset)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"id": record_id, "timestamp": timestamp} for record_id, timestamp in rows]
+
+
+# Hàm đọc nội dung lịch học của một bản ghi (None nếu không có)
+def load_record(record_id, db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    conn = connect(db_path, legacy_file)
+    try:
+        row = conn.execute("SELECT schedule FROM history WHERE id = ?", (record_id,)).fetchone()
+    finally:
+        conn.close()
+    return None if row is None else json.loads(row[0])
+
+
+# Hàm kiểm tra kho lịch sử có bản ghi nào không
+def has_history(db_path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+    conn = connect(db_path, legacy_file)
+    try:
+        return conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is not None
+    finally:
+        conn.close()
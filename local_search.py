@@ -0,0 +1,195 @@
+import math
+import time
+import numpy as np
+from ga_engine import Occupancy, N_COMPONENTS, batch_components, clash_counts, delta_components, score_components
+
+# Các phương pháp tinh chỉnh cục bộ được hỗ trợ
+METHODS = ("annealing", "tabu")
+# Các loại bước đi: đổi phòng (hoặc đổi phòng cho nhau), dời sang cặp phòng x slot còn trống, chuỗi Kempe
+MOVES = ("room", "slot", "kempe")
+# Chuỗi Kempe dài hơn giới hạn này thì bỏ qua (thay đổi quá nhiều môn trong một bước)
+MAX_CHAIN = 12
+
+
+# Trạng thái tìm kiếm cục bộ trên một lịch: gen, thành phần fitness và bảng chiếm dụng được cập nhật
+# tăng dần sau mỗi bước đi. Mỗi bước đi là danh sách (môn, gen mới), được đánh giá bằng delta_components.
+class LocalSearch:
+    def __init__(self, problem, genes, rng, movable=None):
+        self.problem = problem
+        self.rng = rng
+        self.genes = np.array(genes, dtype=genes.dtype, copy=True)
+        self.components = batch_components(problem, self.genes)[0]
+        self.score = score_components(self.components)[0]
+        self.occupancy = Occupancy(problem, self.genes)
+        self.movable = np.ones(problem.n_courses, dtype=bool) if movable is None else np.asarray(movable, dtype=bool)
+        self.courses = np.flatnonzero(self.movable & (problem.course_options > 0))
+
+    def feasible(self):
+        return clash_counts(self.components)[0] == 0
+
+    # Chọn ngẫu nhiên một bước đi; None nếu bước được chọn không thực hiện được
+    def propose(self):
+        if not self.courses.size:
+            return None
+        c = self.courses[self.rng.integers(self.courses.size)]
+        # Môn chưa xếp chỉ có thể được đặt vào một cặp còn trống
+        kind = MOVES[self.rng.integers(len(MOVES))] if self.genes[c] >= 0 else "slot"
+        if kind == "room":
+            return self._room_move(c)
+        if kind == "slot":
+            return self._slot_move(c)
+        return self._kempe_move(c)
+
+    # Đổi sang một phòng hợp lệ khác cùng khung giờ; nếu phòng đó đang có môn khác đúng khung giờ này
+    # và phòng cũ hợp lệ với môn đó thì hai môn đổi phòng cho nhau
+    def _room_move(self, c):
+        problem, n_rooms = self.problem, self.problem.n_rooms
+        room, slot = self.genes[c] % n_rooms, self.genes[c] // n_rooms
+        rooms = problem.course_rooms[c]
+        new_room = rooms[self.rng.integers(rooms.size)]
+        if new_room == room:
+            return None
+        moves = [(c, int(slot * n_rooms + new_room))]
+        for d in np.flatnonzero(self.genes == slot * n_rooms + new_room):
+            if self.movable[d] and (problem.course_rooms[d] == room).any():
+                moves.append((d, int(slot * n_rooms + room)))
+                break
+        return moves
+
+    # Dời môn sang một cặp phòng x slot ngẫu nhiên còn trống (tra bảng chiếm dụng, bỏ qua chính môn đó)
+    def _slot_move(self, c):
+        problem, n_rooms = self.problem, self.problem.n_rooms
+        old = int(self.genes[c])
+        if old >= 0:
+            self.occupancy.remove(c, old % n_rooms, old // n_rooms)
+        free = np.argwhere(self.occupancy.free_mask(c))
+        if old >= 0:
+            self.occupancy.place(c, old % n_rooms, old // n_rooms)
+        if not len(free):
+            return None
+        i, j = free[self.rng.integers(len(free))]
+        new = int(problem.course_slots[c][j] * n_rooms + problem.course_rooms[c][i])
+        return None if new == old else [(c, new)]
+
+    # Chuỗi Kempe giữa slot hiện tại a của môn c và một slot b khác: môn c sang b, các môn cùng giáo viên/nhóm
+    # đang ở đúng slot b sang a, rồi lan tiếp cho tới khi không còn môn nào bị trùng vì chuỗi đổi chỗ.
+    # Các môn giữ nguyên phòng. Bỏ qua nếu có môn chồng lấn một phần (không đúng slot a/b), môn không được
+    # đổi hoặc không dùng được slot đích.
+    def _kempe_move(self, c):
+        problem, n_rooms, genes = self.problem, self.problem.n_rooms, self.genes
+        a = int(genes[c] // n_rooms)
+        slots = problem.course_slots[c]
+        b = int(slots[self.rng.integers(slots.size)])
+        if a == b:
+            return None
+        course_slot = np.where(genes >= 0, genes // n_rooms, -1)
+        moving = {c: b}
+        queue = [c]
+        while queue:
+            x = queue.pop()
+            target = moving[x]
+            source = a if target == b else b
+            for members in (problem.teacher_courses[problem.course_teacher[x]],
+                            problem.group_courses[problem.course_group[x]]):
+                for y in members:
+                    if y == x or y in moving or course_slot[y] < 0:
+                        continue
+                    if course_slot[y] == target:
+                        if not self.movable[y] or source not in problem.course_slots[y]:
+                            return None
+                        moving[y] = source
+                        queue.append(y)
+                    elif problem.slot_conflicts[course_slot[y], target]:
+                        return None
+            if len(moving) > MAX_CHAIN:
+                return None
+        return [(y, int(slot * n_rooms + genes[y] % n_rooms)) for y, slot in moving.items()]
+
+    # Thực hiện tạm bước đi trên gen; trả về (điểm mới, thay đổi thành phần, danh sách hoàn tác)
+    def apply(self, moves):
+        delta = np.zeros(N_COMPONENTS, dtype=np.int64)
+        undo = []
+        for c, new in moves:
+            delta += delta_components(self.problem, self.genes, c, new)
+            undo.append((c, int(self.genes[c])))
+            self.genes[c] = new
+        return score_components(self.components + delta)[0], delta, undo
+
+    def revert(self, undo):
+        for c, old in reversed(undo):
+            self.genes[c] = old
+
+    # Giữ bước đi đã thực hiện bởi apply(): cập nhật thành phần fitness và bảng chiếm dụng
+    def commit(self, score, delta, undo):
+        n_rooms = self.problem.n_rooms
+        for c, old in undo:
+            new = int(self.genes[c])
+            if old >= 0:
+                self.occupancy.remove(c, old % n_rooms, old // n_rooms)
+            if new >= 0:
+                self.occupancy.place(c, new % n_rooms, new // n_rooms)
+        self.components = self.components + delta
+        self.score = score
+
+
+# Hàm tinh chỉnh một lịch (thường là lịch tốt nhất của thuật toán di truyền) bằng tìm kiếm cục bộ:
+#   "annealing": mô phỏng luyện kim, nhận bước đi kém hơn với xác suất exp(chênh lệch / nhiệt độ),
+#                nhiệt độ giảm dần từ temperature xuống final_temperature sau iterations bước
+#   "tabu": mỗi bước xét candidates bước đi ngẫu nhiên và chọn bước tốt nhất; gen vừa rời đi bị cấm quay lại
+#           trong tabu_tenure bước (trừ khi tạo ra lịch tốt nhất từ trước tới nay)
+# movable: mặt nạ các môn được phép đổi (None = tất cả). Dừng sớm khi cancel (threading.Event) được set
+# hoặc quá deadline (time.time()). Chỉ lịch không có trùng mới được nhận là lịch tốt nhất.
+# Trả về (gen tốt nhất, thống kê).
+def refine(problem, genes, rng, method="annealing", iterations=2000, movable=None, temperature=5.0,
+           final_temperature=0.1, tabu_tenure=20, candidates=20, cancel=None, deadline=None):
+    if method not in METHODS:
+        raise ValueError(f"Phương pháp tìm kiếm cục bộ không hợp lệ: {method}")
+    start = time.perf_counter()
+    search = LocalSearch(problem, genes, rng, movable)
+    start_score = search.score
+    best_genes, best_score = np.array(genes, copy=True), search.score if search.feasible() else -np.inf
+    cooling = (final_temperature / temperature) ** (1 / max(iterations, 1))
+    tabu = {}
+    accepted = 0
+    done = 0
+    while done < iterations:
+        if (cancel is not None and cancel.is_set()) or (deadline is not None and time.time() >= deadline):
+            break
+        done += 1
+        if method == "annealing":
+            moves = search.propose()
+            if moves is None:
+                continue
+            score, delta, undo = search.apply(moves)
+            change = score - search.score
+            if change >= 0 or rng.random() < math.exp(change / temperature):
+                search.commit(score, delta, undo)
+                accepted += 1
+            else:
+                search.revert(undo)
+            temperature *= cooling
+        else:
+            chosen = None
+            for _ in range(candidates):
+                moves = search.propose()
+                if moves is None:
+                    continue
+                score, delta, undo = search.apply(moves)
+                feasible = clash_counts(search.components + delta)[0] == 0
+                search.revert(undo)
+                allowed = all(tabu.get((c, new), 0) < done for c, new in moves) or (feasible and score > best_score)
+                if allowed and (chosen is None or score > chosen[0]):
+                    chosen = (score, moves)
+            if chosen is None:
+                continue
+            score, delta, undo = search.apply(chosen[1])
+            search.commit(score, delta, undo)
+            accepted += 1
+            for c, old in undo:
+                tabu[(c, old)] = done + tabu_tenure
+        if search.score > best_score and search.feasible():
+            best_genes, best_score = search.genes.copy(), search.score
+    return best_genes, {
+        "method": method, "iterations": done, "accepted": accepted, "start_fitness": float(start_score),
+        "fitness": float(best_score), "elapsed": time.perf_counter() - start,
+    }
@@ -0,0 +1,156 @@
+import numpy as np
+
+# Giả định mỗi tiết học là 50 phút
+LESSON_DURATION = 50  # phút
+
+# Dư quá số chỗ này so với sĩ số nhóm thì phòng bị phạt (dư // 10)
+EXCESS_CAPACITY_THRESHOLD = 20
+
+# Ánh xạ ngày tiếng Việt sang tiếng Anh
+DAY_MAPPING = {
+    "Thứ 2": "Monday",
+    "Thứ 3": "Tuesday",
+    "Thứ 4": "Wednesday",
+    "Thứ 5": "Thursday",
+    "Thứ 6": "Friday",
+    "Thứ 7": "Saturday",
+    "Thứ CN": "Sunday"
+}
+DAY_INDEX = {day: i for i, day in enumerate(DAY_MAPPING)}
+DAY_NAMES = list(DAY_MAPPING)
+
+# Số phút trong một tuần: thời điểm tuyệt đối = chỉ số ngày * 1440 + phút trong ngày
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+# Bước dịch giờ bắt đầu của một buổi học bên trong khung rảnh của giáo viên
+START_STEP = LESSON_DURATION  # phút
+
+
+# Tính thời lượng cần thiết từ số tiết
+def calculate_duration_minutes(duration_lessons):
+    return duration_lessons * LESSON_DURATION
+
+
+# Chuyển "HH:MM" thành số phút tính từ 0 giờ
+def _to_minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+# Tách khung thời gian "Thứ 2-13:00-17:00" thành (chỉ số ngày, phút bắt đầu, phút kết thúc)
+def parse_slot_minutes(time_str):
+    day_vn, times = time_str.split("-", 1)
+    start_time, end_time = times.split("-")
+    return DAY_INDEX[day_vn], _to_minutes(start_time), _to_minutes(end_time)
+
+
+# Ghép (chỉ số ngày, phút bắt đầu, phút kết thúc) lại thành chuỗi "Thứ 2-13:00-14:40"
+def format_slot(day, start, end):
+    return f"{DAY_NAMES[day]}-{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+
+# Bài toán đã được "biên dịch": mọi tra cứu theo tên, kiểm tra phòng hợp lệ và phân tích
+# khung thời gian được làm một lần sau khi nhập dữ liệu. Các toán tử di truyền chỉ đọc từ đây.
+class CompiledProblem:
+    def __init__(self, classroom_data, teacher_data, student_groups, courses):
+        self.rooms = list(classroom_data)
+        self.teachers = list(teacher_data)
+        self.groups = list(student_groups)
+        self.courses = list(courses)
+
+        # Ánh xạ tên -> chỉ số (trùng tên thì lấy phần tử đầu tiên như trước đây)
+        self.room_index = self._index(self.rooms)
+        self.teacher_index = self._index(self.teachers)
+        self.group_index = self._index(self.groups)
+        self.course_index = self._index(self.courses)
+
+        # Khung rảnh của giáo viên, phân tích sẵn thành (ngày, phút bắt đầu, phút kết thúc)
+        self.teacher_windows = [
+            [parse_slot_minutes(time) for time in teacher["available_times"]] for teacher in self.teachers
+        ]
+
+        self.location_names = []
+        location_index = {}
+        for room in self.rooms:
+            if room["location"] not in location_index:
+                location_index[room["location"]] = len(self.location_names)
+                self.location_names.append(room["location"])
+        self.room_location = np.array([location_index[room["location"]] for room in self.rooms], dtype=np.int64)
+        room_capacity = np.array([room["capacity"] for room in self.rooms], dtype=np.int64)
+        room_equipment = [set(room["equipment"]) for room in self.rooms]
+
+        self.n_courses = len(self.courses)
+        self.n_rooms = len(self.rooms)
+        self.n_teachers = len(self.teachers)
+        self.n_groups = len(self.groups)
+
+        self.course_teacher = np.full(self.n_courses, -1, dtype=np.int64)
+        self.course_group = np.full(self.n_courses, -1, dtype=np.int64)
+        self.course_minutes = np.zeros(self.n_courses, dtype=np.int64)
+        self.excess_penalty = np.zeros((self.n_courses, self.n_rooms), dtype=np.int64)
+        # Danh sách phòng hợp lệ (đủ chỗ, đủ thiết bị) và các vị trí đặt buổi học của từng môn
+        self.course_rooms = []
+        course_placements = []
+        for c, course in enumerate(self.courses):
+            t = self.teacher_index.get(course["teacher"], -1)
+            g = self.group_index.get(course["group"], -1)
+            self.course_teacher[c], self.course_group[c] = t, g
+            self.course_minutes[c] = calculate_duration_minutes(course["duration"])
+            valid_rooms = np.empty(0, dtype=np.int64)
+            placements = {}
+            if t >= 0 and g >= 0:
+                group_size = self.groups[g]["size"]
+                required = set(course["required_equipment"])
+                valid_rooms = np.array([
+                    r for r in np.flatnonzero(room_capacity >= group_size)
+                    if required <= room_equipment[r]
+                ], dtype=np.int64)
+                # Buổi học chiếm đúng số phút cần thiết, bắt đầu tại các mốc cách nhau START_STEP
+                # trong mỗi khung rảnh đủ dài; phần còn lại của khung vẫn dùng được cho môn khác.
+                # Giữ thứ tự khung rảnh như giáo viên đã khai báo.
+                minutes = int(self.course_minutes[c])
+                for day, start, end in self.teacher_windows[t]:
+                    for begin in range(start, end - minutes + 1, START_STEP):
+                        placements.setdefault((day, begin, begin + minutes))
+                excess_capacity = room_capacity - group_size
+                self.excess_penalty[c] = np.where(excess_capacity > EXCESS_CAPACITY_THRESHOLD, excess_capacity // 10, 0)
+            self.course_rooms.append(valid_rooms)
+            course_placements.append(list(placements))
+
+        # Khung thời gian (slot) là một khoảng (ngày, bắt đầu, kết thúc) cụ thể, đánh số theo thứ tự
+        # thời gian trong tuần; hai slot khác nhau vẫn có thể chồng lấn nhau
+        slot_keys = sorted({key for placements in course_placements for key in placements})
+        key_index = {key: i for i, key in enumerate(slot_keys)}
+        self.slot_names = [format_slot(*key) for key in slot_keys]
+        self.slot_index = {name: i for i, name in enumerate(self.slot_names)}
+        self.slot_day = np.array([key[0] for key in slot_keys], dtype=np.int64)
+        self.slot_start = np.array([key[1] for key in slot_keys], dtype=np.int64)
+        self.slot_end = np.array([key[2] for key in slot_keys], dtype=np.int64)
+        # Thời điểm tuyệt đối trong tuần, dùng để phát hiện chồng lấn
+        self.slot_begin = self.slot_day * DAY_MINUTES + self.slot_start
+        self.slot_finish = self.slot_day * DAY_MINUTES + self.slot_end
+        self.n_slots = len(slot_keys)
+        self.course_slots = [
+            np.array([key_index[key] for key in placements], dtype=np.int64) for placements in course_placements
+        ]
+        # slot_conflicts[i, j]: hai slot i và j chồng lấn nhau (mặt nạ dùng khi khởi tạo lịch)
+        self.slot_conflicts = (
+            (self.slot_begin[:, None] < self.slot_finish[None, :]) &
+            (self.slot_begin[None, :] < self.slot_finish[:, None])
+        )
+        # Số cặp (phòng, slot) khả thi của từng môn: môn càng ít lựa chọn càng khó xếp
+        self.course_options = np.array(
+            [rooms.size * slots.size for rooms, slots in zip(self.course_rooms, self.course_slots)], dtype=np.int64
+        )
+
+        # Các môn của từng giáo viên/nhóm (tăng dần theo chỉ số môn), dùng cho đánh giá tăng dần
+        self.teacher_courses = [np.flatnonzero(self.course_teacher == t) for t in range(self.n_teachers)]
+        self.group_courses = [np.flatnonzero(self.course_group == g) for g in range(self.n_groups)]
+
+    @staticmethod
+    def _index(items):
+        index = {}
+        for i, item in enumerate(items):
+            index.setdefault(item["name"], i)
+        return index
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Các cột của bảng số liệu theo thế hệ
+GENERATION_FIELDS = ["generation", "time", "best_fitness", "evaluations", "cache_hits", "cache_misses",
+                     "infeasible", "unique"]
+
+
+# Đo thời gian từng giai đoạn của thuật toán di truyền và ghi số liệu theo thế hệ.
+#   phase(name): khối lệnh cần đo (with profiler.phase("evaluation"): ...), cộng dồn thời gian và số lần gọi
+#   generation(...): ghi một dòng số liệu sau mỗi thế hệ (infeasible: số lịch có trùng);
+#                    số đếm lấy từ counters() (tổng cộng dồn)
+#   on_event(event, payload): hàm móc tùy chọn, nhận "phase" sau mỗi giai đoạn và "generation" sau mỗi thế hệ
+class Profiler:
+    enabled = True
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.generations = []
+        self.counters = None
+        self.start = time.perf_counter()
+        self._totals = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[name] += elapsed
+            self.calls[name] += 1
+            if self.on_event:
+                self.on_event("phase", {"name": name, "seconds": elapsed})
+
+    def generation(self, done, population, fitness, infeasible):
+        totals = self.counters() if self.counters else {}
+        row = {
+            "generation": done,
+            "time": time.perf_counter() - self.start,
+            "best_fitness": float(fitness.max()),
+        }
+        # Số đếm của riêng thế hệ này = tổng hiện tại - tổng ở lần ghi trước
+        for key in ("evaluations", "cache_hits", "cache_misses"):
+            row[key] = totals.get(key, 0) - self._totals.get(key, 0)
+        self._totals = totals
+        row["infeasible"] = infeasible
+        row["unique"] = len({genes.tobytes() for genes in population})
+        self.generations.append(row)
+        if self.on_event:
+            self.on_event("generation", row)
+
+    # Tổng hợp theo giai đoạn: thời gian, số lần gọi và tỉ lệ trên tổng thời gian đã đo
+    def summary(self):
+        total = sum(self.seconds.values()) or 1.0
+        return [
+            {"phase": name, "seconds": seconds, "calls": self.calls[name], "share": seconds / total}
+            for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+        ]
+
+    def export_json(self):
+        return json.dumps({"phases": self.summary(), "generations": self.generations}, ensure_ascii=False, indent=4)
+
+    def export_csv(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=GENERATION_FIELDS)
+        writer.writeheader()
+        writer.writerows(self.generations)
+        return buffer.getvalue()
+
+    # Ghi ra file: .csv là bảng theo thế hệ, còn lại là JSON gồm cả tổng hợp theo giai đoạn
+    def save(self, path):
+        text = self.export_csv() if path.lower().endswith(".csv") else self.export_json()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+
+# Bản tắt đo đạc: mọi lệnh gọi đều không làm gì, chi phí gần như bằng 0
+class NullProfiler:
+    enabled = False
+    counters = None
+    _null = nullcontext()
+
+    def phase(self, name):
+        return self._null
+
+    def generation(self, done, population, fitness, infeasible):
+        pass
+
+
+NO_PROFILER = NullProfiler()
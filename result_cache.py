@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Thư mục lưu cache kết quả xếp lịch (dùng chung cho mọi phiên)
+CACHE_DIR = ".schedule_cache"
+# Dung lượng tối đa của thư mục cache; vượt quá thì xóa các mục lâu không dùng nhất
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Tham số không ảnh hưởng tới kết quả (chỉ ảnh hưởng tốc độ) nên không đưa vào khóa
+IGNORED_PARAMS = {"workers", "cache_size", "on_generation", "cancel", "initial_population", "keep_elites",
+                  "profiler", "on_seed", "shard_workers"}
+
+
+# Hàm băm nội dung: JSON chuẩn hóa (sắp xếp khóa, không khoảng trắng thừa) rồi SHA-256.
+# Thứ tự các phần tử trong danh sách được giữ nguyên vì nó quyết định cách mã hóa gen.
+def content_hash(value):
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Khóa của dữ liệu bài toán (phòng học, giáo viên, nhóm sinh viên, môn học)
+def problem_key(data):
+    return content_hash(data)
+
+
+# Khóa của một lần chạy: dữ liệu bài toán cùng các tham số thuật toán di truyền
+def solution_key(data, ga_params):
+    params = {key: value for key, value in ga_params.items() if key not in IGNORED_PARAMS}
+    return content_hash({"data": problem_key(data), "params": params})
+
+
+# Cache kết quả trên đĩa, đánh địa chỉ theo nội dung. Mỗi mục là một file JSON:
+#   solution-<khóa lần chạy>.json: lịch tốt nhất và thống kê (trúng chính xác -> trả về ngay)
+#   elites-<khóa dữ liệu>.json: gen của nhóm ưu tú lần chạy gần nhất (cùng dữ liệu, khác tham số
+#   -> dùng làm cá thể mồi cho quần thể ban đầu)
+# Mỗi lần đọc trúng cập nhật thời gian sửa đổi của file; khi vượt max_bytes thì xóa file cũ nhất trước.
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, f"{kind}-{key}.json")
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    # Ghi file tạm rồi đổi tên để phiên khác không bao giờ đọc phải file ghi dở
+    def _write(self, path, value):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    # Trả về {"schedule", "stats"} của lần chạy trùng khớp hoặc None
+    def get(self, data, ga_params):
+        return self._read(self._path("solution", solution_key(data, ga_params)))
+
+    # Trả về danh sách gen nhóm ưu tú đã lưu cho cùng dữ liệu hoặc None
+    def get_elites(self, data):
+        entry = self._read(self._path("elites", problem_key(data)))
+        return entry["elites"] if entry else None
+
+    def put(self, data, ga_params, schedule, stats):
+        self._write(self._path("solution", solution_key(data, ga_params)), {
+            "schedule": schedule, "stats": stats, "created": time.time()
+        })
+
+    def put_elites(self, data, elites):
+        self._write(self._path("elites", problem_key(data)), {"elites": elites, "created": time.time()})
+
+    # Xóa các mục lâu không dùng nhất cho tới khi tổng dung lượng không vượt max_bytes.
+    # Phiên khác có thể xóa file cùng lúc: file không còn thì bỏ qua.
+    def evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
@@ -0,0 +1,359 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import pandas as pd
+from problem import CompiledProblem
+import numpy as np
+from ga_engine import run_ga, decode_schedule, encode_schedule, repair, SELECTIONS, CROSSOVERS
+from workbook import read_workbook
+from result_cache import ResultCache, CACHE_MAX_BYTES
+from profiling import Profiler, NO_PROFILER
+from local_search import refine, METHODS
+from decomposition import solve_sharded, SHARD_MODES
+
+# Dữ liệu bài toán là một dictionary gồm 4 danh sách như khi đọc từ Excel/nhập tay:
+#   classroom_data, teacher_data, student_groups, courses
+DATA_KEYS = ("classroom_data", "teacher_data", "student_groups", "courses")
+# Tham số của bước tinh chỉnh cục bộ sau thuật toán di truyền (không chuyển cho run_ga)
+LOCAL_SEARCH_PARAMS = ("local_search", "local_search_iterations")
+# Tham số chia bài toán thành nhiều phần giải song song (không chuyển cho run_ga)
+SHARD_PARAMS = ("shards", "shard_by", "shard_workers")
+
+
+# Hàm biên dịch dữ liệu bài toán thành CompiledProblem
+def compile_problem(data):
+    return CompiledProblem(*(data.get(key, []) for key in DATA_KEYS))
+
+
+# Hàm tinh chỉnh lịch tốt nhất của thuật toán di truyền bằng tìm kiếm cục bộ (local_search là "annealing"
+# hoặc "tabu", None = bỏ qua). Chỉ các môn movable được đổi; stats được cập nhật fitness mới và thêm
+# stats["local_search"]. Lần chạy đã bị hủy thì không tinh chỉnh; dừng sớm khi quá deadline (time.time()).
+def refine_best(problem, best, stats, local_search=None, local_search_iterations=2000, movable=None, seed=None,
+                cancel=None, profiler=None, deadline=None):
+    if best is None or not local_search or stats.get("stop_reason") == "cancelled":
+        return best
+    with (profiler or NO_PROFILER).phase("local_search"):
+        best, stats["local_search"] = refine(problem, best, np.random.default_rng(seed), local_search,
+                                             local_search_iterations, movable, cancel=cancel, deadline=deadline)
+    stats["fitness"] = max(stats["fitness"], stats["local_search"]["fitness"])
+    return best
+
+
+# Hạn thời gian (time.time()) của lần chạy bắt đầu lúc start theo time_budget (giây), None nếu không giới hạn.
+# Thuật toán di truyền và bước tinh chỉnh dùng chung một ngân sách thời gian.
+def run_deadline(start, ga_params):
+    return start + ga_params["time_budget"] if ga_params.get("time_budget") else None
+
+
+# Hàm xếp lịch cho dữ liệu đã cho, không phụ thuộc Streamlit.
+# problem: bài toán đã biên dịch sẵn từ data (nếu có) để khỏi biên dịch lại; ga_params chuyển thẳng cho run_ga
+# (trừ LOCAL_SEARCH_PARAMS, dùng cho refine_best).
+# shards > 1: chia bài toán theo shard_by ("location" hoặc "coupling") và giải các phần song song bằng
+# solve_sharded thay cho run_ga (không có tiến độ theo thế hệ, không hủy được giữa chừng).
+# cache: ResultCache (nếu có). Trùng dữ liệu và tham số thì trả về lịch đã lưu ngay; chỉ trùng dữ liệu thì
+# quần thể ban đầu được mồi bằng nhóm ưu tú đã lưu. stats["cache"] là "hit", "warm" hoặc "miss".
+# Trả về (lịch học, thống kê); lịch rỗng nếu thiếu dữ liệu hoặc không tìm được lịch hợp lệ.
+def solve(data, problem=None, cache=None, **ga_params):
+    if not all(data.get(key) for key in ("classroom_data", "teacher_data", "courses")):
+        return [], {}
+    run_params = {key: value for key, value in ga_params.items()
+                  if key not in LOCAL_SEARCH_PARAMS and key not in SHARD_PARAMS}
+    search_params = {key: ga_params[key] for key in LOCAL_SEARCH_PARAMS if key in ga_params}
+    shards = ga_params.get("shards") or 1
+    seeds = None
+    if cache is not None:
+        hit = cache.get(data, ga_params)
+        if hit is not None:
+            return hit["schedule"], dict(hit["stats"], cache="hit")
+        # Chế độ chia bài toán không dùng cá thể mồi và không giữ nhóm ưu tú (gen của từng shard)
+        if shards == 1:
+            seeds = cache.get_elites(data)
+            if seeds and "initial_population" not in run_params:
+                run_params["initial_population"] = seeds
+            run_params.setdefault("keep_elites", ga_params.get("elite_size", 10))
+
+    profiler = ga_params.get("profiler") or NO_PROFILER
+    with profiler.phase("compile"):
+        problem = problem or compile_problem(data)
+    start = time.time()
+    if shards > 1:
+        best, stats = solve_sharded(problem, ga_params.get("shard_by") or "coupling", shards,
+                                    ga_params.get("shard_workers"), **run_params)
+    else:
+        best, stats = run_ga(problem, **run_params)
+    best = refine_best(problem, best, stats, seed=ga_params.get("seed"), cancel=ga_params.get("cancel"),
+                       profiler=ga_params.get("profiler"), deadline=run_deadline(start, ga_params), **search_params)
+    elites = stats.pop("elites", None)
+    with profiler.phase("decode"):
+        schedule = [] if best is None else decode_schedule(problem, best)
+    if cache is not None:
+        if elites:
+            cache.put_elites(data, elites)
+        # Lần chạy bị hủy giữa chừng không được coi là kết quả của bộ tham số này
+        if schedule and stats["stop_reason"] != "cancelled":
+            cache.put(data, ga_params, schedule, stats)
+        stats["cache"] = "warm" if seeds else "miss"
+    return schedule, stats
+
+
+# Hàm so sánh hai bộ dữ liệu, trả về tập thay đổi: tên các phòng, giáo viên, nhóm và môn học
+# được thêm, bị xóa hoặc có thông tin khác đi
+def diff_data(old_data, new_data):
+    changes = {}
+    for key, kind in zip(DATA_KEYS, ("rooms", "teachers", "groups", "courses")):
+        old = {item["name"]: item for item in old_data.get(key, [])}
+        new = {item["name"]: item for item in new_data.get(key, [])}
+        changes[kind] = sorted(name for name in old.keys() | new.keys() if old.get(name) != new.get(name))
+    return changes
+
+
+# Hàm đánh dấu các môn có buổi học trong lịch cũ (mặt nạ theo chỉ số môn), kể cả khi buổi học đó không còn
+# hợp lệ với dữ liệu mới. Môn trùng tên được ghép theo thứ tự xuất hiện như encode_schedule.
+def scheduled_courses(problem, schedule):
+    course_ids = {}
+    for c, course in enumerate(problem.courses):
+        course_ids.setdefault(course["name"], []).append(c)
+    scheduled = np.zeros(problem.n_courses, dtype=bool)
+    for entry in schedule:
+        ids = course_ids.get(entry["Môn học"])
+        if ids:
+            scheduled[ids.pop(0)] = True
+    return scheduled
+
+
+# Hàm xác định các môn cần xếp lại (mặt nạ theo chỉ số môn):
+#   - môn thuộc tập thay đổi: chính môn đó, giáo viên/nhóm của môn hoặc phòng môn đang dùng bị thay đổi
+#   - môn có buổi học trong lịch cũ (scheduled) nhưng buổi học đó không còn hợp lệ với dữ liệu mới
+#   - nếu neighbors: mọi môn dùng chung giáo viên hoặc nhóm với một môn ở trên (láng giềng xung đột)
+#   - môn chưa được xếp trong lịch cũ: được xếp lại nhưng không kéo theo láng giềng, nên khi không có
+#     thay đổi nào thì mọi môn đã xếp đều giữ nguyên
+# scheduled: xem scheduled_courses; None = coi mọi môn chưa có gen là chưa được xếp.
+def affected_courses(problem, previous, changes=None, neighbors=True, scheduled=None):
+    affected = previous < 0
+    if scheduled is not None:
+        affected &= scheduled
+    else:
+        affected[:] = False
+    if changes:
+        names = {kind: set(changes.get(kind, [])) for kind in ("rooms", "teachers", "groups", "courses")}
+        rooms = np.where(previous >= 0, previous % max(problem.n_rooms, 1), -1)
+        for c, course in enumerate(problem.courses):
+            if (course["name"] in names["courses"] or course["teacher"] in names["teachers"] or
+                    course["group"] in names["groups"] or
+                    (rooms[c] >= 0 and problem.rooms[rooms[c]]["name"] in names["rooms"])):
+                affected[c] = True
+    if neighbors:
+        teachers = np.unique(problem.course_teacher[affected])
+        groups = np.unique(problem.course_group[affected])
+        affected |= np.isin(problem.course_teacher, teachers[teachers >= 0])
+        affected |= np.isin(problem.course_group, groups[groups >= 0])
+    return affected | (previous < 0)
+
+
+# Hàm xếp lại lịch sau khi dữ liệu thay đổi ít (giữa học kỳ) từ một lịch cũ (lấy từ lịch sử hoặc cache).
+# Các môn không bị ảnh hưởng giữ nguyên buổi học cũ; chỉ các môn bị ảnh hưởng (xem affected_courses)
+# được tối ưu lại, quần thể ban đầu xuất phát từ lịch cũ. stats có thêm "affected" (số môn được xếp lại)
+# và "moved" (số môn có buổi học khác lịch cũ).
+def reschedule(data, previous_schedule, changes=None, neighbors=True, problem=None, **ga_params):
+    if not all(data.get(key) for key in ("classroom_data", "teacher_data", "courses")):
+        return [], {}
+    profiler = ga_params.get("profiler") or NO_PROFILER
+    with profiler.phase("compile"):
+        problem = problem or compile_problem(data)
+        previous = encode_schedule(problem, previous_schedule)
+    affected = affected_courses(problem, previous, changes, neighbors, scheduled_courses(problem, previous_schedule))
+    # Chỉ một phần nhỏ các môn được xếp lại nên không chia bài toán (bỏ qua SHARD_PARAMS)
+    run_params = {key: value for key, value in ga_params.items()
+                  if key not in LOCAL_SEARCH_PARAMS and key not in SHARD_PARAMS}
+    search_params = {key: ga_params[key] for key in LOCAL_SEARCH_PARAMS if key in ga_params}
+    start = time.time()
+    best, stats = run_ga(problem, base_genes=previous, fixed=~affected, initial_population=[previous], **run_params)
+    best = refine_best(problem, best, stats, movable=affected, seed=ga_params.get("seed"),
+                       cancel=ga_params.get("cancel"), profiler=ga_params.get("profiler"),
+                       deadline=run_deadline(start, ga_params), **search_params)
+    stats["affected"] = int(affected.sum())
+    if best is None:
+        return [], stats
+    stats["moved"] = int((best != previous).sum())
+    with profiler.phase("decode"):
+        return decode_schedule(problem, best), stats
+
+
+# Chạy solve() trong một luồng nền. Tiến độ từng thế hệ được lưu vào progress (không kèm gen), tiến độ tạo
+# quần thể ban đầu vào seeding (số cá thể đã tạo, kích thước quần thể),
+# cá thể tốt nhất tới hiện tại vào best; cancel() yêu cầu dừng và vẫn trả về lịch tốt nhất đã có.
+# Lịch tốt nhất tạm thời có thể còn trùng: best_schedule() sửa hết trùng (bỏ xếp môn không còn chỗ) trước khi trả về.
+# Có previous (lịch cũ) thì chạy reschedule() với tập thay đổi changes thay cho solve().
+class BackgroundSolve:
+    def __init__(self, data, problem=None, previous=None, changes=None, **ga_params):
+        self.data = data
+        self.problem = problem or compile_problem(data)
+        self.previous = previous
+        self.changes = changes
+        self.ga_params = ga_params
+        self.progress = []
+        self.seeding = None
+        # Mặt nạ các môn được xếp lại khi chạy reschedule() (None = tất cả)
+        self.movable = None
+        self.best = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _on_generation(self, progress):
+        best = progress.pop("best")
+        with self._lock:
+            self.best = best
+            self.progress.append(progress)
+
+    def _on_seed(self, built, total):
+        self.seeding = (built, total)
+
+    def _run(self):
+        try:
+            if self.previous is not None:
+                self.movable = affected_courses(self.problem, encode_schedule(self.problem, self.previous),
+                                                self.changes, scheduled=scheduled_courses(self.problem, self.previous))
+                self.result = reschedule(self.data, self.previous, self.changes, problem=self.problem,
+                                         on_generation=self._on_generation, on_seed=self._on_seed,
+                                         cancel=self._cancel, **self.ga_params)
+            else:
+                self.result = solve(self.data, self.problem, on_generation=self._on_generation,
+                                    on_seed=self._on_seed, cancel=self._cancel, **self.ga_params)
+        except Exception as error:
+            self.error = error
+
+    @property
+    def done(self):
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.progress)
+
+    # Lịch tốt nhất tìm được tới hiện tại (rỗng nếu chưa có lịch nào)
+    def best_schedule(self):
+        with self._lock:
+            best = self.best
+            clashing = bool(self.progress) and self.progress[-1]["best_conflicts"] > 0
+        if best is None:
+            return []
+        if clashing:
+            # Sửa trên bản sao; khi xếp lại từ lịch cũ chỉ các môn bị ảnh hưởng được chuyển hoặc bỏ xếp
+            best = best.copy()
+            repair(self.problem, best, np.random.default_rng(self.ga_params.get("seed")), self.movable, drop=True)
+        return decode_schedule(self.problem, best)
+
+
+# Hàm ghi lịch học ra file: .json giữ nguyên danh sách, còn lại ghi CSV giống nút tải xuống của ứng dụng
+def write_schedule(schedule, path):
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(schedule, f, ensure_ascii=False, indent=4)
+    else:
+        pd.DataFrame(schedule).to_csv(path, index=False, encoding="utf-8-sig", sep=";")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Xếp lịch học bằng thuật toán di truyền từ file Excel")
+    parser.add_argument("workbook", help="File Excel cùng định dạng với Danh_sach.xlsx")
+    parser.add_argument("-o", "--output", action="append", default=[],
+                        help="File kết quả (.csv hoặc .json), có thể lặp lại; mặc định in JSON ra màn hình")
+    parser.add_argument("--stats", help="Ghi thống kê quá trình chạy ra file JSON")
+    parser.add_argument("--profile", help="Đo thời gian từng giai đoạn, ghi ra file (.json: đầy đủ, .csv: theo thế hệ)")
+    parser.add_argument("--population-size", type=int, default=100)
+    parser.add_argument("--generations", type=int, default=500)
+    parser.add_argument("--mutation-rate", type=float, default=0.1)
+    parser.add_argument("--crossover-rate", type=float, default=1.0)
+    parser.add_argument("--elite-size", type=int, default=10)
+    parser.add_argument("--parent-pool", type=int, default=50)
+    parser.add_argument("--selection", choices=SELECTIONS, default="truncation")
+    parser.add_argument("--tournament-size", type=int, default=3)
+    parser.add_argument("--crossover", choices=CROSSOVERS, default="midpoint")
+    parser.add_argument("--crossover-points", type=int, default=2)
+    parser.add_argument("--repair-rate", type=float, default=0.05)
+    parser.add_argument("--local-search", choices=METHODS, help="Tinh chỉnh lịch tốt nhất bằng tìm kiếm cục bộ sau GA")
+    parser.add_argument("--local-search-iterations", type=int, default=2000)
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Chia bài toán thành nhiều phần giải song song (bài toán lớn, nhiều cơ sở)")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default="coupling",
+                        help="Chia theo tòa nhà (location) hoặc theo liên kết giáo viên/nhóm (coupling)")
+    parser.add_argument("--shard-workers", type=int,
+                        help="Số tiến trình giải các phần song song (mặc định theo số lõi)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--islands", type=int, default=1)
+    parser.add_argument("--migration-interval", type=int, default=50)
+    parser.add_argument("--migration-size", type=int, default=5)
+    parser.add_argument("--cache-size", type=int, default=50000)
+    parser.add_argument("--time-budget", type=float)
+    parser.add_argument("--patience", type=int)
+    parser.add_argument("--target-fitness", type=float)
+    parser.add_argument("--min-diversity", type=float)
+    parser.add_argument("--previous", help="Lịch cũ (file .json do -o ghi ra): chỉ xếp lại các môn bị ảnh hưởng")
+    parser.add_argument("--previous-workbook", help="File Excel đã dùng để tạo lịch cũ, để xác định các thay đổi")
+    parser.add_argument("--cache-dir", help="Thư mục cache kết quả (mặc định không dùng cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=CACHE_MAX_BYTES / 1024 / 1024)
+    args = parser.parse_args(argv)
+
+    data, errors = read_workbook(args.workbook)
+    if errors:
+        for error in errors:
+            print(error, file=sys.stderr)
+        return 1
+    cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024)) if args.cache_dir else None
+    ga_params = {key: value for key, value in vars(args).items()
+                 if key not in ("workbook", "output", "stats", "profile", "cache_dir", "cache_max_mb", "previous",
+                                "previous_workbook")}
+    profiler = Profiler() if args.profile else None
+    if profiler:
+        ga_params["profiler"] = profiler
+    if args.previous:
+        with open(args.previous, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        changes = None
+        if args.previous_workbook:
+            old_data, errors = read_workbook(args.previous_workbook)
+            if errors:
+                for error in errors:
+                    print(error, file=sys.stderr)
+                return 1
+            changes = diff_data(old_data, data)
+        schedule, stats = reschedule(data, previous, changes, **ga_params)
+    else:
+        schedule, stats = solve(data, cache=cache, **ga_params)
+
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=4)
+    if profiler:
+        profiler.save(args.profile)
+    if not schedule:
+        print("Không thể tạo lịch học. Vui lòng kiểm tra dữ liệu đầu vào!", file=sys.stderr)
+        return 1
+    for path in args.output:
+        write_schedule(schedule, path)
+    if not args.output:
+        json.dump(schedule, sys.stdout, ensure_ascii=False, indent=4)
+        print()
+    print(f"Fitness {stats['fitness']:.0f} sau {stats['generations']} thế hệ ({stats['elapsed']:.1f} s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
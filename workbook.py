@@ -0,0 +1,122 @@
+import pandas as pd
+
+# Tên chỉ gồm chữ (kể cả tiếng Việt), số và khoảng trắng
+NAME_PATTERN = "[a-zA-Z0-9\\s\u00C0-\u1EF9]+"
+# Một khung thời gian rảnh, ví dụ "Thứ 2-13:00-17:00"
+TIME_SLOT_PATTERN = r"(Thứ [2-7]|Thứ CN)-([0-1][0-9]|2[0-3]):([0-5][0-9])-([0-1][0-9]|2[0-3]):([0-5][0-9])"
+
+# Các sheet của file Excel và các cột bắt buộc
+SHEETS = {
+    "Phòng Học": ["Tên phòng học", "Sức chứa", "Thiết bị", "Vị trí"],
+    "Giáo Viên": ["Tên giáo viên", "Thời gian rảnh"],
+    "Nhóm Sinh Viên": ["Tên nhóm", "Số sinh viên"],
+    "Môn Học": ["Tên môn học", "Giáo viên", "Nhóm sinh viên", "Thời lượng (số tiết)", "Thiết bị yêu cầu"],
+}
+
+
+# Hàm đánh dấu các ô tên không hợp lệ (trống hoặc chứa ký tự đặc biệt)
+def invalid_names(series):
+    return series.isna() | ~series.astype(str).str.fullmatch(NAME_PATTERN)
+
+
+# Hàm đánh dấu các ô không phải là số
+def invalid_numbers(series):
+    return pd.to_numeric(series, errors="coerce").isna()
+
+
+# Hàm đánh dấu các ô thời gian rảnh sai định dạng hoặc có giờ bắt đầu không trước giờ kết thúc.
+# Tách mọi khung thời gian của cả cột một lần rồi kiểm tra bằng các phép toán trên chuỗi của pandas.
+def invalid_time_lists(series):
+    pieces = series.fillna("").astype(str).str.split(",").explode().str.strip()
+    pieces = pieces[pieces != ""]
+    parts = pieces.str.extract(f"^{TIME_SLOT_PATTERN}$")
+    matched = pieces.str.fullmatch(TIME_SLOT_PATTERN).fillna(False).astype(bool)
+    hours = parts[[1, 2, 3, 4]].fillna("0").astype(int)
+    ordered = hours[1] * 60 + hours[2] < hours[3] * 60 + hours[4]
+    bad_rows = pieces.index[~(matched & ordered)].unique()
+    return series.isna() | series.index.isin(bad_rows)
+
+
+# Hàm tách chuỗi danh sách thiết bị (ô trống = không có thiết bị)
+def _equipment_lists(series):
+    return [value.split(",") if value else [] for value in series.fillna("").astype(str)]
+
+
+# Hàm đọc toàn bộ file Excel bằng một lần phân tích.
+# Trả về (dữ liệu, danh sách lỗi); dữ liệu gồm classroom_data, teacher_data, student_groups, courses.
+# Mọi dòng sai được liệt kê cùng lúc (số dòng tính như trong Excel, dòng 1 là tiêu đề).
+def read_workbook(file):
+    sheets = pd.read_excel(file, sheet_name=None)
+    data = {"classroom_data": [], "teacher_data": [], "student_groups": [], "courses": []}
+    errors = []
+
+    frames = {}
+    for sheet, columns in SHEETS.items():
+        if sheet not in sheets:
+            continue
+        df = sheets[sheet].reset_index(drop=True)
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            errors.append(f"Sheet '{sheet}' thiếu cột: {', '.join(missing)}")
+            continue
+        frames[sheet] = df
+
+    checks = {
+        "Phòng Học": [
+            ("Tên phòng học", invalid_names, "tên phòng học chứa ký tự đặc biệt hoặc bị trống"),
+            ("Sức chứa", invalid_numbers, "sức chứa không phải là số"),
+        ],
+        "Giáo Viên": [
+            ("Tên giáo viên", invalid_names, "tên giáo viên chứa ký tự đặc biệt hoặc bị trống"),
+            ("Thời gian rảnh", invalid_time_lists, "thời gian rảnh không đúng định dạng"),
+        ],
+        "Nhóm Sinh Viên": [
+            ("Tên nhóm", invalid_names, "tên nhóm chứa ký tự đặc biệt hoặc bị trống"),
+            ("Số sinh viên", invalid_numbers, "số sinh viên không phải là số"),
+        ],
+        "Môn Học": [
+            ("Tên môn học", invalid_names, "tên môn học chứa ký tự đặc biệt hoặc bị trống"),
+            ("Giáo viên", invalid_names, "tên giáo viên chứa ký tự đặc biệt hoặc bị trống"),
+            ("Nhóm sinh viên", invalid_names, "tên nhóm chứa ký tự đặc biệt hoặc bị trống"),
+            ("Thời lượng (số tiết)", invalid_numbers, "thời lượng không phải là số"),
+        ],
+    }
+    for sheet, df in frames.items():
+        for column, check, message in checks[sheet]:
+            for row in df.index[check(df[column])]:
+                errors.append(f"Sheet '{sheet}' dòng {row + 2}: {message} ('{df.at[row, column]}')")
+    if errors:
+        return data, errors
+
+    if "Phòng Học" in frames:
+        df = frames["Phòng Học"]
+        data["classroom_data"] = [
+            {"name": name, "capacity": capacity, "equipment": equipment, "location": location}
+            for name, capacity, equipment, location in zip(
+                df["Tên phòng học"].astype(str), pd.to_numeric(df["Sức chứa"]).astype(int).tolist(),
+                _equipment_lists(df["Thiết bị"]), df["Vị trí"].fillna("").astype(str)
+            )
+        ]
+    if "Giáo Viên" in frames:
+        df = frames["Giáo Viên"]
+        times = df["Thời gian rảnh"].astype(str).str.split(",")
+        data["teacher_data"] = [
+            {"name": name, "available_times": [t.strip() for t in slots if t.strip()]}
+            for name, slots in zip(df["Tên giáo viên"].astype(str), times)
+        ]
+    if "Nhóm Sinh Viên" in frames:
+        df = frames["Nhóm Sinh Viên"]
+        data["student_groups"] = [
+            {"name": name, "size": size}
+            for name, size in zip(df["Tên nhóm"].astype(str), pd.to_numeric(df["Số sinh viên"]).astype(int).tolist())
+        ]
+    if "Môn Học" in frames:
+        df = frames["Môn Học"]
+        data["courses"] = [
+            {"name": name, "teacher": teacher, "group": group, "duration": duration, "required_equipment": equipment}
+            for name, teacher, group, duration, equipment in zip(
+                df["Tên môn học"].astype(str), df["Giáo viên"].astype(str), df["Nhóm sinh viên"].astype(str),
+                pd.to_numeric(df["Thời lượng (số tiết)"]).astype(int).tolist(), _equipment_lists(df["Thiết bị yêu cầu"])
+            )
+        ]
+    return data, errors